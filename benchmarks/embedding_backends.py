@@ -0,0 +1,59 @@
+"""
+Compares the article embedding backends on the real `article_description` texts.
+
+    python benchmarks/embedding_backends.py --n-texts 2000 --num-threads 4
+"""
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from recsys.features.articles import compute_features_articles  # noqa: E402
+from recsys.features.embedding_backends import (  # noqa: E402
+    BACKENDS,
+    available_backends,
+    benchmark_backends,
+)
+from recsys.raw_data_sources import h_and_m  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--backends",
+        nargs="+",
+        default=list(available_backends()),
+        choices=BACKENDS,
+        help="Defaults to the backends whose dependencies are installed.",
+    )
+    parser.add_argument("--n-texts", type=int, default=2_000)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--num-threads", type=int)
+    parser.add_argument("--threshold", type=float, default=0.99, help="Minimum cosine similarity to the torch backend.")
+    args = parser.parse_args()
+
+    articles_df = compute_features_articles(h_and_m.extract_articles_df())
+    texts = articles_df.sample(n=min(args.n_texts, len(articles_df)), seed=27)["article_description"].to_list()
+
+    results = benchmark_backends(
+        texts,
+        backends=tuple(args.backends),
+        batch_size=args.batch_size,
+        num_threads=args.num_threads,
+        threshold=args.threshold,
+    )
+
+    print(f"{'backend':12s} {'texts/s':>10s} {'speedup':>8s} {'min cos':>8s} {'mean cos':>9s}  parity")
+    baseline = next((r["texts_per_second"] for r in results if r["backend"] == "torch"), None)
+    for r in results:
+        speedup = r["texts_per_second"] / baseline if baseline else float("nan")
+        print(
+            f"{r['backend']:12s} {r['texts_per_second']:10.1f} {speedup:7.2f}x "
+            f"{r['min_cosine']:8.4f} {r['mean_cosine']:9.4f}  {'ok' if r['parity_passed'] else 'FAIL'}"
+        )
+    return 0 if all(r["parity_passed"] for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""
+Tracks `python -X importtime` for the common recsys entry points.
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --repeat 5 --output import_time.json --max-ms 500
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+
+ENTRY_POINTS = [
+    "recsys",
+    "recsys.config",
+    "recsys.features.customers",
+    "recsys.features.transactions",
+    "recsys.features.articles",
+    "recsys.features.interaction",
+    "recsys.raw_data_sources.h_and_m",
+    "recsys.mlflow_integration.feature_store",
+]
+
+# Dependencies that should only be loaded when a caller actually needs them.
+HEAVY_MODULES = ["torch", "sentence_transformers", "hsfs", "hopsworks", "feast", "pandas"]
+
+
+def parse_importtime(stderr: str) -> dict[str, int]:
+    "Parses `-X importtime` output into {module: cumulative microseconds}."
+    cumulative = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        cumulative[name.strip()] = int(cumulative_us)
+    return cumulative
+
+
+def measure(entry_point: str) -> dict:
+    env = {**os.environ, "PYTHONPATH": f"{ROOT_DIR}{os.pathsep}{os.environ.get('PYTHONPATH', '')}"}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {entry_point}"],
+        capture_output=True,
+        text=True,
+        env=env,
+        cwd=ROOT_DIR,
+    )
+    if result.returncode != 0:
+        return {"error": result.stderr.strip().splitlines()[-1]}
+
+    cumulative = parse_importtime(result.stderr)
+    return {
+        "total_ms": cumulative.get(entry_point, 0) / 1000,
+        "heavy_modules": sorted(m for m in HEAVY_MODULES if m in cumulative),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("entry_points", nargs="*", default=ENTRY_POINTS)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per entry point, the median is reported.")
+    parser.add_argument("--output", type=Path, help="Append the results as one JSON line to this file.")
+    parser.add_argument("--max-ms", type=float, help="Exit non-zero when an entry point is slower than this.")
+    args = parser.parse_args()
+
+    results = {}
+    for entry_point in args.entry_points:
+        runs = [measure(entry_point) for _ in range(args.repeat)]
+        errors = [run["error"] for run in runs if "error" in run]
+        if errors:
+            results[entry_point] = {"error": errors[0]}
+            print(f"{entry_point:45s} ERROR {errors[0]}")
+            continue
+        total_ms = statistics.median(run["total_ms"] for run in runs)
+        heavy = runs[-1]["heavy_modules"]
+        results[entry_point] = {"total_ms": total_ms, "heavy_modules": heavy}
+        print(f"{entry_point:45s} {total_ms:9.1f} ms  heavy: {', '.join(heavy) or '-'}")
+
+    if args.output:
+        with args.output.open("a", encoding="utf-8") as f:
+            f.write(json.dumps({"python": sys.version.split()[0], "results": results}) + "\n")
+
+    if args.max_ms is not None:
+        slow = [
+            name
+            for name, result in results.items()
+            if "error" in result or result["total_ms"] > args.max_ms
+        ]
+        if slow:
+            print(f"Over budget ({args.max_ms} ms): {', '.join(slow)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,31 @@
-from . import features, raw_data_sources, mlflow_integration
+import importlib
+
+# Submodules are imported on first attribute access so that `import recsys` stays cheap
+# and does not drag in torch, hsfs, feast or pandas for callers that never use them.
+_SUBMODULES = {
+    "config",
+    "evaluation",
+    "features",
+    "inference",
+    "mlflow_integration",
+    "raw_data_sources",
+    "training",
+}
 
 __all__ = [
     "features",
     "raw_data_sources",
     "mlflow_integration",
-]
\ No newline at end of file
+]
+
+
+def __getattr__(name: str):
+    if name in _SUBMODULES:
+        module = importlib.import_module(f".{name}", __name__)
+        globals()[name] = module
+        return module
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | _SUBMODULES)
@@ -22,6 +22,11 @@ class Setting(BaseSettings):
     #feature engineering
     CUSTOM_DATA_SIZE: CustomDatasetSize = CustomDatasetSize.SMALL
     FEATURES_EMBEDDING_MODEL_ID: str  | None = None
+    FEATURES_EMBEDDING_BACKEND: str = 'torch'
+    FEATURES_EMBEDDING_NUM_THREADS: int | None = None
+    FEATURES_EMBEDDING_ONNX_DIR: str='/home/u22/Recsys/models/onnx'
     FEAST_REPO_PATH: str='/home/u22/Recsys'
+    IMAGES_CACHE_DIR: str='/home/u22/Recsys/recsys/raw_data_sources/dataset/images'
+    PROFILES_CACHE_DIR: str='/home/u22/Recsys/recsys/raw_data_sources/dataset/profiles'
 
 settings = Setting()
\ No newline at end of file
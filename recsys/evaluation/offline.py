@@ -0,0 +1,192 @@
+from datetime import date, datetime
+
+import numpy as np
+import polars as pl
+
+DEFAULT_SEGMENTS = ("age_group", "club_member_status")
+
+
+def _to_t_dat(value: date | datetime | int, dtype: pl.DataType) -> pl.Expr:
+    "Turns a window bound into a literal comparable with the t_dat column."
+    if isinstance(value, int) or not dtype.is_integer():
+        return pl.lit(value)
+    if not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day)
+    # Feature pipelines store t_dat as naive epoch milliseconds, see `compute_features_transactions`.
+    return pl.lit(int((value.replace(tzinfo=None) - datetime(1970, 1, 1)).total_seconds() * 1000))
+
+
+def split_window(
+    transactions: pl.DataFrame,
+    start: date | datetime | int,
+    end: date | datetime | int | None = None,
+) -> tuple[pl.DataFrame, pl.DataFrame]:
+    "Splits transactions into the history before `start` and the held-out window [start, end)."
+    dtype = transactions.schema["t_dat"]
+    in_window = pl.col("t_dat") >= _to_t_dat(start, dtype)
+    if end is not None:
+        in_window = in_window & (pl.col("t_dat") < _to_t_dat(end, dtype))
+    history = transactions.filter(pl.col("t_dat") < _to_t_dat(start, dtype))
+    return history, transactions.filter(in_window)
+
+
+def _idcg_table(max_k: int) -> pl.DataFrame:
+    "Ideal DCG for 0..max_k relevant items, joined on the number of relevant items."
+    gains = 1.0 / np.log2(np.arange(max_k) + 2)
+    return pl.DataFrame(
+        {
+            "n_ideal": np.arange(max_k + 1, dtype=np.int64),
+            "idcg": np.concatenate([[0.0], np.cumsum(gains)]),
+        }
+    )
+
+
+def per_customer_metrics(
+    predictions: pl.DataFrame,
+    held_out: pl.DataFrame,
+    popularity: pl.DataFrame,
+    k: int = 12,
+    recall_ks: tuple[int, ...] = (12, 50),
+) -> tuple[pl.DataFrame, pl.DataFrame]:
+    """
+    Computes AP@k, recall@k, NDCG@k and the popularity of the recommendations for every
+    customer with held-out purchases, in one explode/join/group_by pass.
+    `predictions` has customer_id and a ranked list column `article_ids`.
+    Returns the per-customer metrics and the exploded top-k recommendations of all customers.
+    """
+    max_k = max(k, *recall_ks)
+    truth_pairs = held_out.select("customer_id", "article_id").unique()
+    truth = truth_pairs.group_by("customer_id").agg(pl.len().alias("n_truth"))
+
+    exploded = (
+        predictions.select(
+            pl.col("customer_id"), pl.col("article_ids").alias("article_id")
+        )
+        .explode("article_id")
+        .drop_nulls("article_id")
+        # A repeated article only counts at its best rank.
+        .unique(["customer_id", "article_id"], keep="first", maintain_order=True)
+        .with_columns(rank=pl.int_range(pl.len()).over("customer_id"))
+        .filter(pl.col("rank") < max_k)
+        .join(truth_pairs.with_columns(hit=pl.lit(True)), on=["customer_id", "article_id"], how="left")
+        .join(popularity, on="article_id", how="left")
+        .with_columns(
+            hit=pl.col("hit").fill_null(False),
+            popularity_percentile=pl.col("popularity_percentile").fill_null(0.0),
+        )
+        .with_columns(cum_hits=pl.col("hit").cast(pl.Int64).cum_sum().over("customer_id"))
+    )
+
+    in_top_k = pl.col("rank") < k
+    top_k_hit = pl.col("hit") & in_top_k
+    aggregated = exploded.join(truth, on="customer_id", how="semi").group_by("customer_id").agg(
+        ap_sum=pl.when(top_k_hit).then(pl.col("cum_hits") / (pl.col("rank") + 1)).otherwise(0.0).sum(),
+        dcg=pl.when(top_k_hit).then(1.0 / (pl.col("rank") + 2).log(2)).otherwise(0.0).sum(),
+        popularity_percentile=pl.col("popularity_percentile").filter(in_top_k).mean(),
+        **{f"hits@{rk}": (pl.col("hit") & (pl.col("rank") < rk)).sum() for rk in recall_ks},
+    )
+
+    metrics = (
+        truth.join(aggregated, on="customer_id", how="left")
+        .with_columns(pl.exclude("customer_id", "n_truth", "popularity_percentile").fill_null(0))
+        .with_columns(n_ideal=pl.min_horizontal("n_truth", pl.lit(k, dtype=pl.UInt32)).cast(pl.Int64))
+        .join(_idcg_table(k), on="n_ideal", how="left")
+        .select(
+            "customer_id",
+            "n_truth",
+            (pl.col("ap_sum") / pl.col("n_ideal")).alias(f"map@{k}"),
+            *[(pl.col(f"hits@{rk}") / pl.col("n_truth")).alias(f"recall@{rk}") for rk in recall_ks],
+            (pl.col("dcg") / pl.col("idcg")).alias(f"ndcg@{k}"),
+            "popularity_percentile",
+        )
+    )
+    return metrics, exploded.filter(in_top_k).select("customer_id", "article_id")
+
+
+def article_popularity(history: pl.DataFrame) -> pl.DataFrame:
+    "Popularity percentile of every article in the history: 1.0 is the best seller."
+    return (
+        history.group_by("article_id")
+        .agg(pl.len().alias("n_purchases"))
+        .with_columns(
+            popularity_percentile=pl.col("n_purchases").rank("average") / pl.len()
+        )
+        .select("article_id", "popularity_percentile")
+    )
+
+
+def evaluate_recommendations(
+    predictions: pl.DataFrame,
+    transactions: pl.DataFrame,
+    start: date | datetime | int,
+    end: date | datetime | int | None = None,
+    customers: pl.DataFrame | None = None,
+    k: int = 12,
+    recall_ks: tuple[int, ...] = (12, 50),
+    catalogue_size: int | None = None,
+    segments: tuple[str, ...] = DEFAULT_SEGMENTS,
+) -> dict[str, pl.DataFrame]:
+    """
+    Offline evaluation of ranked recommendations against the purchases in [start, end).
+
+    Returns a dict of frames: 'overall', one frame per segment column found in `customers`
+    (by default `age_group` and `club_member_status`), and 'per_customer'. Metrics are
+    averaged over customers with held-out purchases, customers without predictions score 0.
+    Coverage is the share of the catalogue recommended in anyone's top-k, popularity
+    bias the mean popularity percentile of the top-k versus the held-out purchases.
+    """
+    transactions = transactions.with_columns(pl.col("article_id").cast(pl.Utf8))
+    predictions = predictions.with_columns(pl.col("article_ids").cast(pl.List(pl.Utf8)))
+    history, held_out = split_window(transactions, start, end)
+    popularity = article_popularity(history)
+    catalogue_size = catalogue_size or transactions["article_id"].n_unique()
+
+    metrics, recommended = per_customer_metrics(predictions, held_out, popularity, k, recall_ks)
+    truth_popularity = (
+        held_out.select("customer_id", "article_id")
+        .join(popularity, on="article_id", how="left")
+        .with_columns(pl.col("popularity_percentile").fill_null(0.0))
+    )
+
+    metric_columns = [c for c in metrics.columns if c not in ("customer_id", "n_truth")]
+
+    def summarize(group_by: str | None) -> pl.DataFrame:
+        aggs = [pl.len().alias("n_customers"), *[pl.col(c).mean() for c in metric_columns]]
+        coverage = pl.col("article_id").n_unique().truediv(catalogue_size).alias(f"coverage@{k}")
+        truth_pop = pl.col("popularity_percentile").mean().alias("held_out_popularity_percentile")
+        if group_by is None:
+            return pl.concat(
+                [
+                    metrics.select(aggs),
+                    recommended.select(coverage),
+                    truth_popularity.select(truth_pop),
+                ],
+                how="horizontal",
+            )
+        segment = customers.select("customer_id", group_by)
+        return (
+            metrics.join(segment, on="customer_id", how="left")
+            .group_by(group_by)
+            .agg(aggs)
+            .join(
+                recommended.join(segment, on="customer_id", how="left").group_by(group_by).agg(coverage),
+                on=group_by,
+                how="left",
+                join_nulls=True,
+            )
+            .join(
+                truth_popularity.join(segment, on="customer_id", how="left").group_by(group_by).agg(truth_pop),
+                on=group_by,
+                how="left",
+                join_nulls=True,
+            )
+            .sort(group_by, nulls_last=True)
+        )
+
+    results = {"overall": summarize(None)}
+    if customers is not None:
+        for column in segments:
+            if column in customers.columns:
+                results[column] = summarize(column)
+    results["per_customer"] = metrics
+    return results
@@ -1,10 +1,18 @@
+from __future__ import annotations
+
 import io
 import sys
 import contextlib
+from typing import TYPE_CHECKING
 
 from tqdm.auto import tqdm
 import polars as pl
-from sentence_transformers import SentenceTransformer
+
+from recsys.features.profiling import non_null_columns
+
+if TYPE_CHECKING:
+    # Only needed for annotations, importing it pulls in torch.
+    from sentence_transformers import SentenceTransformer
 
 def get_article_id(df: pl.DataFrame) -> pl.Series:
     "Extracts and return the article_id column as a string."
@@ -25,8 +33,14 @@ def create_article_description(row):
     
     return description
 
-def compute_features_articles(df: pl.DataFrame) -> pl.DataFrame:
-    "Prepares the input df by creating new features and droppign specific columns"
+def compute_features_articles(
+        df: pl.DataFrame, profile: pl.DataFrame | None = None
+) -> pl.DataFrame:
+    """
+    Prepares the input df by creating new features and droppign specific columns.
+    `profile` is the column profile of the input df (see `recsys.features.profiling`),
+    when given its null counts decide which columns to drop instead of rescanning the data.
+    """
     df = df.with_columns(
         [
             get_article_id(df).alias("article_id"),
@@ -39,8 +53,21 @@ def compute_features_articles(df: pl.DataFrame) -> pl.DataFrame:
     #img urls
     df = df.with_columns(image_url=pl.col('article_id').map_elements(get_image_url))
 
-    #drop null
-    df = df.select([col for col in df.columns if not df[col].is_null().any()])
+    #drop null, columns the profile does not cover (e.g. derived ones) only need their null counts
+    null_counts = pl.DataFrame(schema={"column": pl.Utf8, "null_count": pl.Int64})
+    if profile is not None:
+        null_counts = profile.select(pl.col("column"), pl.col("null_count").cast(pl.Int64))
+    missing = [col for col in df.columns if col not in set(null_counts["column"])]
+    if missing:
+        missing_counts = (
+            df.select(missing)
+            .null_count()
+            .unpivot(variable_name="column", value_name="null_count")
+            .with_columns(pl.col("null_count").cast(pl.Int64))
+        )
+        null_counts = pl.concat([null_counts, missing_counts])
+    keep = set(non_null_columns(null_counts))
+    df = df.select([col for col in df.columns if col in keep])
 
     #remove 'detail_desc'
     columns_to_drop = ['detail_desc', 'detail_desc_length']
@@ -3,6 +3,9 @@ import random
 import polars as pl
 
 from recsys.config import CustomDatasetSize
+from recsys.features.profiling import check_profile, null_count
+
+CUSTOMER_COLUMNS = ["customer_id", "club_member_status", "age", "postal_code"]
 
 class DatasetSampler:
     _SIZES = {
@@ -57,7 +60,7 @@ def creat_age_group() -> pl.Expr:
     ).alias("age_group")
 
 def compute_features_customers(
-        df: pl.DataFrame, drop_null_age: bool=False
+        df: pl.DataFrame, drop_null_age: bool=False, profile: pl.DataFrame | None = None
 ) -> pl.DataFrame:
     """
     1. Checks for required columns in the input DataFrame.
@@ -66,14 +69,26 @@ def compute_features_customers(
     4. Creat an age groups
     5. Cast the 'age' to fl64
     6. Selects and orders specific columns in the ouput.
+
+    With a column `profile` of the input df, null handling is skipped for columns
+    the profile reports as complete.
     """
+    if profile is not None:
+        failures = check_profile(profile, required_columns=CUSTOMER_COLUMNS)
+        if failures:
+            raise ValueError(" ".join(failures))
+
+    def has_nulls(column: str) -> bool:
+        return profile is None or null_count(profile, column) != 0
+
+    if has_nulls("club_member_status"):
+        df = df.pipe(fill_missing_club_member_status)
+    if has_nulls("age"):
+        df = df.pipe(drop_na_age)
+
     df = (
-        df.pipe(fill_missing_club_member_status)
-        .pipe(drop_na_age)
-        .with_columns([creat_age_group(), pl.col("age").cast(pl.Float64)])
-        .select(
-            ["customer_id", "club_member_status", "age", "postal_code", "age_group"]
-        )
+        df.with_columns([creat_age_group(), pl.col("age").cast(pl.Float64)])
+        .select(CUSTOMER_COLUMNS + ["age_group"])
     )
     if drop_null_age is True:
         df = df.drop_nulls(subset=["age"])
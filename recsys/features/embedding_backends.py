@@ -0,0 +1,261 @@
+from __future__ import annotations
+
+import importlib.util
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import numpy as np
+from loguru import logger
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+BACKENDS = ("torch", "torch-int8", "onnx")
+# onnxruntime is an optional dependency, the torch backends only need sentence-transformers.
+_BACKEND_MODULES = {"onnx": "onnxruntime"}
+_ONNX_INSTALL_HINT = "The 'onnx' embedding backend needs onnxruntime, install it with `pip install onnxruntime`."
+
+
+def is_backend_available(backend: str) -> bool:
+    module = _BACKEND_MODULES.get(backend)
+    return module is None or importlib.util.find_spec(module) is not None
+
+
+def available_backends() -> tuple[str, ...]:
+    "The backends whose optional dependencies are installed."
+    return tuple(backend for backend in BACKENDS if is_backend_available(backend))
+
+
+def set_num_threads(num_threads: int | None) -> None:
+    "Caps the intra-op threads of torch (and so of the quantized backend)."
+    if num_threads is None:
+        return
+    import torch
+
+    torch.set_num_threads(num_threads)
+
+
+def quantize_dynamic_int8(model: SentenceTransformer) -> SentenceTransformer:
+    """
+    Dynamic int8 quantization of every `nn.Linear`: weights are stored as int8 and
+    activations are quantized on the fly, which is where the CPU time of a transformer goes.
+    """
+    import torch
+
+    model.eval()
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+class OnnxSentenceEncoder:
+    """
+    Runs the transformer of a SentenceTransformer as an exported ONNX graph with
+    onnxruntime and reproduces its pooling/normalization in numpy.
+    Exposes the `encode(texts, ...)` / `device` subset used by `generate_embeddings_for_dataframe`.
+    """
+
+    device = "cpu"
+
+    def __init__(
+        self,
+        model: SentenceTransformer,
+        onnx_path: str | Path,
+        num_threads: int | None = None,
+    ) -> None:
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError(_ONNX_INSTALL_HINT) from e
+
+        from sentence_transformers import models
+
+        transformer = model[0]
+        pooling = next((m for m in model if isinstance(m, models.Pooling)), None)
+        self.tokenizer = transformer.tokenizer
+        self.max_seq_length = transformer.max_seq_length
+        self.pooling_mode = "cls" if pooling is not None and pooling.pooling_mode_cls_token else "mean"
+        self.normalize = any(isinstance(m, models.Normalize) for m in model)
+
+        onnx_path = Path(onnx_path)
+        if not onnx_path.exists():
+            export_onnx(model, onnx_path)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads is not None:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(
+            str(onnx_path), sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self._input_names = {i.name for i in self.session.get_inputs()}
+
+    def encode(
+        self, sentences: list[str], batch_size: int = 32, show_progress_bar: bool = False, **kwargs
+    ) -> np.ndarray:
+        embeddings = []
+        for start in range(0, len(sentences), batch_size):
+            tokens = self.tokenizer(
+                sentences[start : start + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np",
+            )
+            inputs = {
+                name: value.astype(np.int64)
+                for name, value in tokens.items()
+                if name in self._input_names
+            }
+            token_embeddings = self.session.run(None, inputs)[0]
+            if self.pooling_mode == "cls":
+                pooled = token_embeddings[:, 0]
+            else:
+                mask = tokens["attention_mask"][..., None].astype(np.float32)
+                pooled = (token_embeddings * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+            if self.normalize:
+                pooled = pooled / np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+            embeddings.append(pooled.astype(np.float32))
+        return np.concatenate(embeddings) if embeddings else np.empty((0, 0), dtype=np.float32)
+
+
+def export_onnx(model: SentenceTransformer, onnx_path: str | Path, opset: int = 14) -> Path:
+    "Exports the transformer of a SentenceTransformer (token embeddings output) to ONNX."
+    import torch
+
+    transformer = model[0]
+    auto_model = transformer.auto_model.eval()
+    sample = transformer.tokenizer(["an example sentence"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["token_embeddings"] = {0: "batch", 1: "sequence"}
+
+    class TokenEmbeddings(torch.nn.Module):
+        def __init__(self, inner: torch.nn.Module) -> None:
+            super().__init__()
+            self.inner = inner
+
+        def forward(self, *args):
+            return self.inner(**dict(zip(input_names, args)))[0]
+
+    onnx_path = Path(onnx_path)
+    onnx_path.parent.mkdir(parents=True, exist_ok=True)
+    with torch.no_grad():
+        torch.onnx.export(
+            TokenEmbeddings(auto_model),
+            tuple(sample[name] for name in input_names),
+            str(onnx_path),
+            input_names=input_names,
+            output_names=["token_embeddings"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+        )
+    logger.info(f"Exported embedding model to {onnx_path}.")
+    return onnx_path
+
+
+def load_embedding_model(
+    model_id: str | None = None,
+    backend: str | None = None,
+    num_threads: int | None = None,
+    onnx_path: str | Path | None = None,
+):
+    """
+    Loads the article description embedding model on CPU with the selected backend:
+    'torch' (full precision), 'torch-int8' (dynamically quantized) or 'onnx' (onnxruntime).
+    Defaults come from the FEATURES_EMBEDDING_* settings.
+    """
+    from sentence_transformers import SentenceTransformer
+
+    from recsys.config import settings
+
+    model_id = model_id or settings.FEATURES_EMBEDDING_MODEL_ID
+    backend = backend or settings.FEATURES_EMBEDDING_BACKEND
+    num_threads = num_threads or settings.FEATURES_EMBEDDING_NUM_THREADS
+    if backend not in BACKENDS:
+        raise ValueError(f"Unsupported embedding backend '{backend}', use one of {BACKENDS}.")
+    if backend == "onnx" and not is_backend_available(backend):
+        raise ImportError(_ONNX_INSTALL_HINT)
+
+    set_num_threads(num_threads)
+    model = SentenceTransformer(model_id, device="cpu")
+    if backend == "torch":
+        return model
+    if backend == "torch-int8":
+        return quantize_dynamic_int8(model)
+
+    onnx_path = onnx_path or Path(settings.FEATURES_EMBEDDING_ONNX_DIR) / f"{model_id.replace('/', '__')}.onnx"
+    return OnnxSentenceEncoder(model, onnx_path, num_threads=num_threads)
+
+
+def encode(model, texts: list[str], batch_size: int = 32) -> np.ndarray:
+    return np.asarray(
+        model.encode(texts, batch_size=batch_size, show_progress_bar=False), dtype=np.float32
+    )
+
+
+@dataclass
+class ParityReport:
+    min_cosine: float
+    mean_cosine: float
+    threshold: float
+
+    @property
+    def passed(self) -> bool:
+        return self.min_cosine >= self.threshold
+
+
+def check_parity(
+    reference: np.ndarray, candidate: np.ndarray, threshold: float = 0.99
+) -> ParityReport:
+    "Row-wise cosine similarity between reference embeddings and a backend's embeddings."
+    reference = reference / np.maximum(np.linalg.norm(reference, axis=1, keepdims=True), 1e-12)
+    candidate = candidate / np.maximum(np.linalg.norm(candidate, axis=1, keepdims=True), 1e-12)
+    cosine = (reference * candidate).sum(axis=1)
+    return ParityReport(
+        min_cosine=float(cosine.min()), mean_cosine=float(cosine.mean()), threshold=threshold
+    )
+
+
+def benchmark_backends(
+    texts: list[str],
+    backends: tuple[str, ...] = BACKENDS,
+    batch_size: int = 32,
+    num_threads: int | None = None,
+    threshold: float = 0.99,
+    model_id: str | None = None,
+) -> list[dict]:
+    """
+    Embeds `texts` with every backend and reports throughput and parity against the
+    full precision 'torch' backend, which is always run first as the reference.
+    Backends whose optional dependencies are not installed are skipped.
+    """
+    for backend in backends:
+        if not is_backend_available(backend):
+            logger.warning(f"Skipping the '{backend}' backend: {_BACKEND_MODULES[backend]} is not installed.")
+    backends = tuple(b for b in backends if is_backend_available(b))
+
+    reference = None
+    results = []
+    for backend in ("torch", *[b for b in backends if b != "torch"]):
+        model = load_embedding_model(model_id=model_id, backend=backend, num_threads=num_threads)
+        encode(model, texts[:batch_size], batch_size)  # warm-up
+        start = time.perf_counter()
+        embeddings = encode(model, texts, batch_size)
+        elapsed = time.perf_counter() - start
+
+        if reference is None:
+            reference = embeddings
+        parity = check_parity(reference, embeddings, threshold)
+        results.append(
+            {
+                "backend": backend,
+                "texts_per_second": len(texts) / elapsed,
+                "seconds": elapsed,
+                "min_cosine": parity.min_cosine,
+                "mean_cosine": parity.mean_cosine,
+                "parity_passed": parity.passed,
+            }
+        )
+        logger.info(f"{backend}: {results[-1]}")
+    return [r for r in results if r["backend"] in backends]
@@ -0,0 +1,168 @@
+from pathlib import Path
+
+import polars as pl
+from loguru import logger
+
+from recsys.config import settings
+
+DEFAULT_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+_PROFILE_CACHE: dict[tuple[str, str, str], pl.DataFrame] = {}
+
+
+def _quantile_name(q: float) -> str:
+    return f"q{round(q * 100):02d}"
+
+
+def _is_nested(dtype: pl.DataType) -> bool:
+    return isinstance(dtype, (pl.List, pl.Array, pl.Struct, pl.Object))
+
+
+def _is_orderable(dtype: pl.DataType) -> bool:
+    return (
+        dtype.is_numeric()
+        or dtype.is_temporal()
+        or dtype in (pl.Utf8, pl.Boolean)
+    )
+
+
+def profile_columns(
+    df: pl.DataFrame | pl.LazyFrame, quantiles: tuple[float, ...] = DEFAULT_QUANTILES
+) -> pl.DataFrame:
+    """
+    Computes null counts, approximate distinct counts (HyperLogLog), min/max, mean and
+    quantiles for every column in a single lazy `select`, which polars runs in parallel
+    over all columns. Returns one row per column.
+    """
+    lf = df.lazy()
+    schema = lf.collect_schema()
+
+    exprs = [pl.len().alias("__len")]
+    for i, (name, dtype) in enumerate(schema.items()):
+        col = pl.col(name)
+        exprs.append(col.null_count().alias(f"{i}:null_count"))
+        if _is_nested(dtype) or dtype == pl.Null:
+            continue
+        if dtype.is_decimal():
+            # approx_n_unique and quantiles do not support decimals.
+            col = col.cast(pl.Float64)
+        exprs.append(col.approx_n_unique().alias(f"{i}:approx_n_unique"))
+        if _is_orderable(dtype):
+            exprs.append(col.min().cast(pl.Utf8).alias(f"{i}:min"))
+            exprs.append(col.max().cast(pl.Utf8).alias(f"{i}:max"))
+        if dtype.is_numeric():
+            exprs.append(col.mean().cast(pl.Float64).alias(f"{i}:mean"))
+            for q in quantiles:
+                exprs.append(
+                    col.quantile(q, interpolation="linear")
+                    .cast(pl.Float64)
+                    .alias(f"{i}:{_quantile_name(q)}")
+                )
+
+    stats = lf.select(exprs).collect().row(0, named=True)
+    n_rows = stats["__len"]
+
+    records = []
+    for i, (name, dtype) in enumerate(schema.items()):
+        null_count = stats[f"{i}:null_count"]
+        record = {
+            "column": name,
+            "dtype": str(dtype),
+            "count": n_rows,
+            "null_count": null_count,
+            "null_fraction": null_count / n_rows if n_rows else 0.0,
+            "approx_n_unique": stats.get(f"{i}:approx_n_unique"),
+            "min": stats.get(f"{i}:min"),
+            "max": stats.get(f"{i}:max"),
+            "mean": stats.get(f"{i}:mean"),
+        }
+        for q in quantiles:
+            record[_quantile_name(q)] = stats.get(f"{i}:{_quantile_name(q)}")
+        records.append(record)
+
+    schema_out = {
+        "column": pl.Utf8,
+        "dtype": pl.Utf8,
+        "count": pl.Int64,
+        "null_count": pl.Int64,
+        "null_fraction": pl.Float64,
+        "approx_n_unique": pl.Int64,
+        "min": pl.Utf8,
+        "max": pl.Utf8,
+        "mean": pl.Float64,
+        **{_quantile_name(q): pl.Float64 for q in quantiles},
+    }
+    return pl.DataFrame(records, schema=schema_out)
+
+
+def get_or_compute_profile(
+    df: pl.DataFrame | pl.LazyFrame,
+    dataset: str,
+    version: str | int,
+    cache_dir: str | Path | None = None,
+    quantiles: tuple[float, ...] = DEFAULT_QUANTILES,
+) -> pl.DataFrame:
+    """
+    Returns the profile of `dataset` at `version`, computing it only once.
+    Profiles are kept in memory and as parquet under `cache_dir/<dataset>/v<version>.parquet`,
+    so bump the version whenever the underlying data changes.
+    """
+    cache_dir = Path(cache_dir or settings.PROFILES_CACHE_DIR)
+    key = (str(cache_dir), dataset, str(version))
+    if key in _PROFILE_CACHE:
+        return _PROFILE_CACHE[key]
+
+    path = cache_dir / dataset / f"v{version}.parquet"
+    if path.exists():
+        profile = pl.read_parquet(path)
+    else:
+        logger.info(f"Profiling dataset '{dataset}' version {version}.")
+        profile = profile_columns(df, quantiles=quantiles)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        profile.write_parquet(path)
+
+    _PROFILE_CACHE[key] = profile
+    return profile
+
+
+def columns_with_nulls(profile: pl.DataFrame) -> list[str]:
+    return profile.filter(pl.col("null_count") > 0)["column"].to_list()
+
+
+def non_null_columns(profile: pl.DataFrame) -> list[str]:
+    return profile.filter(pl.col("null_count") == 0)["column"].to_list()
+
+
+def null_count(profile: pl.DataFrame, column: str) -> int | None:
+    "Null count of `column` according to the profile, None if it was not profiled."
+    counts = profile.filter(pl.col("column") == column)["null_count"]
+    return counts[0] if len(counts) else None
+
+
+def check_profile(
+    profile: pl.DataFrame,
+    required_columns: list[str] | None = None,
+    not_null: list[str] | None = None,
+    max_null_fraction: dict[str, float] | None = None,
+) -> list[str]:
+    "Runs data quality checks against a profile and returns the list of failures."
+    failures = []
+    by_column = {row["column"]: row for row in profile.iter_rows(named=True)}
+
+    for column in required_columns or []:
+        if column not in by_column:
+            failures.append(f"Missing required column '{column}'.")
+
+    for column in not_null or []:
+        if column in by_column and by_column[column]["null_count"] > 0:
+            failures.append(
+                f"Column '{column}' has {by_column[column]['null_count']} null values."
+            )
+
+    for column, limit in (max_null_fraction or {}).items():
+        if column in by_column and by_column[column]["null_fraction"] > limit:
+            failures.append(
+                f"Column '{column}' null fraction {by_column[column]['null_fraction']:.4f} exceeds {limit}."
+            )
+
+    return failures
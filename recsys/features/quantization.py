@@ -0,0 +1,399 @@
+import time
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+
+
+def embeddings_to_numpy(df: pl.DataFrame, column: str = "embeddings") -> np.ndarray:
+    "Converts a list-of-floats embedding column into a contiguous (n, dim) float32 matrix."
+    dim = len(df[column][0])
+    return (
+        df[column]
+        .cast(pl.Array(pl.Float32, dim))
+        .to_numpy()
+        .astype(np.float32)  # always copy, polars may hand out a read-only view
+        .reshape(len(df), dim)
+    )
+
+
+def _npz_path(path: str | Path) -> Path:
+    "`np.savez` appends '.npz' to bare paths, so save and load agree on the suffix up front."
+    return Path(path).with_suffix(".npz")
+
+
+def _l2_normalize(x: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    return x / np.maximum(norms, 1e-12)
+
+
+def top_k(scores: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    "Returns the indices and scores of the k largest values of every row, best first."
+    k = min(k, scores.shape[1])
+    idx = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    top = np.take_along_axis(scores, idx, axis=1)
+    order = np.argsort(-top, axis=1)
+    return np.take_along_axis(idx, order, axis=1), np.take_along_axis(top, order, axis=1)
+
+
+def exact_search(
+    queries: np.ndarray, embeddings: np.ndarray, k: int, metric: str = "ip"
+) -> tuple[np.ndarray, np.ndarray]:
+    "Brute force full precision search, the reference for recall measurements."
+    queries = np.atleast_2d(queries).astype(np.float32, copy=False)
+    scores = queries @ embeddings.T
+    if metric == "l2":
+        scores = 2 * scores - (embeddings**2).sum(axis=1)[None, :]
+    return top_k(scores, k)
+
+
+class ScalarQuantizer:
+    """
+    Per-dimension int8 quantization: every dimension gets its own offset and scale,
+    fitted on the min/max of the training embeddings. 4x smaller than float32.
+    """
+
+    def __init__(self, metric: str = "ip") -> None:
+        if metric not in ("ip", "l2"):
+            raise ValueError(f"Unsupported metric '{metric}', use 'ip' or 'l2'.")
+        self.metric = metric
+        self.offset: np.ndarray | None = None
+        self.scale: np.ndarray | None = None
+        self.codes: np.ndarray | None = None
+        self.norms: np.ndarray | None = None
+
+    def train(self, embeddings: np.ndarray) -> "ScalarQuantizer":
+        lo = embeddings.min(axis=0).astype(np.float32)
+        hi = embeddings.max(axis=0).astype(np.float32)
+        self.scale = np.maximum(hi - lo, 1e-12) / 255.0
+        # Code -128 maps to `lo`, code 127 maps to `hi`.
+        self.offset = lo + 128.0 * self.scale
+        return self
+
+    def encode(self, embeddings: np.ndarray) -> np.ndarray:
+        codes = np.rint((embeddings - self.offset) / self.scale)
+        return np.clip(codes, -128, 127).astype(np.int8)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return codes.astype(np.float32) * self.scale + self.offset
+
+    def add(self, embeddings: np.ndarray) -> "ScalarQuantizer":
+        return self.add_codes(self.encode(embeddings))
+
+    def add_codes(self, codes: np.ndarray) -> "ScalarQuantizer":
+        self.codes = codes
+        if self.metric == "l2":
+            self.norms = (self.decode(codes) ** 2).sum(axis=1)
+        return self
+
+    def search(
+        self, queries: np.ndarray, k: int, chunk_size: int = 65_536
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Asymmetric search: queries stay float32 while the database stays int8.
+        q . (c * scale + offset) == (q * scale) . c + q . offset, so the codes are
+        never dequantized as a whole, only one chunk is upcast at a time.
+        """
+        queries = np.atleast_2d(queries).astype(np.float32, copy=False)
+        scaled_queries = queries * self.scale
+        bias = queries @ self.offset
+
+        scores = np.empty((len(queries), len(self.codes)), dtype=np.float32)
+        for start in range(0, len(self.codes), chunk_size):
+            chunk = self.codes[start : start + chunk_size].astype(np.float32)
+            scores[:, start : start + chunk_size] = scaled_queries @ chunk.T
+        scores += bias[:, None]
+        if self.metric == "l2":
+            scores = 2 * scores - self.norms[None, :]
+        return top_k(scores, k)
+
+    def nbytes(self) -> int:
+        extra = self.norms.nbytes if self.norms is not None else 0
+        return self.codes.nbytes + self.scale.nbytes + self.offset.nbytes + extra
+
+    def save(self, path: str | Path) -> None:
+        np.savez(
+            _npz_path(path),
+            kind="scalar",
+            metric=self.metric,
+            offset=self.offset,
+            scale=self.scale,
+            codes=self.codes,
+        )
+
+    @classmethod
+    def load(cls, path: str | Path) -> "ScalarQuantizer":
+        with np.load(_npz_path(path)) as data:
+            return cls._from_archive(data)
+
+    @classmethod
+    def _from_archive(cls, data) -> "ScalarQuantizer":
+        quantizer = cls(metric=str(data["metric"]))
+        quantizer.offset = data["offset"]
+        quantizer.scale = data["scale"]
+        return quantizer.add_codes(data["codes"])
+
+
+def _kmeans(
+    x: np.ndarray, n_clusters: int, n_iter: int, rng: np.random.Generator
+) -> np.ndarray:
+    "Plain Lloyd's k-means, good enough for the small sub-spaces of product quantization."
+    centroids = x[rng.choice(len(x), size=n_clusters, replace=len(x) < n_clusters)].copy()
+    for _ in range(n_iter):
+        distances = (
+            (x**2).sum(axis=1)[:, None]
+            - 2 * x @ centroids.T
+            + (centroids**2).sum(axis=1)[None, :]
+        )
+        assignment = distances.argmin(axis=1)
+        counts = np.bincount(assignment, minlength=n_clusters)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, x)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+        # Re-seed dead centroids on random points so every code stays useful.
+        if not filled.all():
+            centroids[~filled] = x[rng.choice(len(x), size=(~filled).sum())]
+    return centroids
+
+
+class ProductQuantizer:
+    """
+    Product quantization: the vector is split into `n_subvectors` sub-spaces and each
+    sub-vector is replaced by the id of its closest centroid in a trained codebook.
+    With 256 centroids per sub-space a vector costs `n_subvectors` bytes.
+    """
+
+    def __init__(
+        self,
+        n_subvectors: int = 16,
+        n_centroids: int = 256,
+        metric: str = "ip",
+        n_iter: int = 20,
+        seed: int = 27,
+    ) -> None:
+        if metric not in ("ip", "l2"):
+            raise ValueError(f"Unsupported metric '{metric}', use 'ip' or 'l2'.")
+        if n_centroids > 256:
+            raise ValueError("n_centroids must fit into a uint8 code (<= 256).")
+        self.n_subvectors = n_subvectors
+        self.n_centroids = n_centroids
+        self.metric = metric
+        self.n_iter = n_iter
+        self.seed = seed
+        self.codebooks: np.ndarray | None = None
+        self.codes: np.ndarray | None = None
+        self.norms: np.ndarray | None = None
+
+    def _split(self, embeddings: np.ndarray) -> np.ndarray:
+        n, dim = embeddings.shape
+        if dim % self.n_subvectors:
+            raise ValueError(
+                f"Embedding dim {dim} is not divisible by n_subvectors={self.n_subvectors}."
+            )
+        return embeddings.reshape(n, self.n_subvectors, dim // self.n_subvectors)
+
+    def train(self, embeddings: np.ndarray, max_train_size: int = 100_000) -> "ProductQuantizer":
+        rng = np.random.default_rng(self.seed)
+        if len(embeddings) > max_train_size:
+            embeddings = embeddings[rng.choice(len(embeddings), max_train_size, replace=False)]
+        sub = self._split(embeddings.astype(np.float32, copy=False))
+        self.codebooks = np.stack(
+            [
+                _kmeans(sub[:, m], self.n_centroids, self.n_iter, rng)
+                for m in range(self.n_subvectors)
+            ]
+        )
+        return self
+
+    def encode(self, embeddings: np.ndarray, chunk_size: int = 65_536) -> np.ndarray:
+        codes = np.empty((len(embeddings), self.n_subvectors), dtype=np.uint8)
+        for start in range(0, len(embeddings), chunk_size):
+            sub = self._split(embeddings[start : start + chunk_size].astype(np.float32))
+            for m in range(self.n_subvectors):
+                codebook = self.codebooks[m]
+                distances = -2 * sub[:, m] @ codebook.T + (codebook**2).sum(axis=1)[None, :]
+                codes[start : start + chunk_size, m] = distances.argmin(axis=1)
+        return codes
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        sub = self.codebooks[np.arange(self.n_subvectors)[None, :], codes]
+        return sub.reshape(len(codes), -1)
+
+    def add(self, embeddings: np.ndarray) -> "ProductQuantizer":
+        return self.add_codes(self.encode(embeddings))
+
+    def add_codes(self, codes: np.ndarray) -> "ProductQuantizer":
+        self.codes = codes
+        if self.metric == "l2":
+            # ||x||^2 of the reconstruction is the sum of the per sub-space centroid norms.
+            centroid_norms = (self.codebooks**2).sum(axis=2)
+            self.norms = centroid_norms[np.arange(self.n_subvectors)[None, :], codes].sum(axis=1)
+        return self
+
+    def search(
+        self, queries: np.ndarray, k: int, chunk_size: int = 65_536
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Asymmetric distance computation: per query, build a (n_subvectors, n_centroids)
+        table of query/centroid inner products, then score every code by summing
+        table lookups. The database is never decoded.
+        """
+        queries = np.atleast_2d(queries).astype(np.float32, copy=False)
+        sub_queries = self._split(queries)
+        # (n_queries, n_subvectors, n_centroids)
+        tables = np.einsum("qmd,mkd->qmk", sub_queries, self.codebooks)
+
+        scores = np.zeros((len(queries), len(self.codes)), dtype=np.float32)
+        for start in range(0, len(self.codes), chunk_size):
+            chunk = self.codes[start : start + chunk_size]
+            out = scores[:, start : start + chunk_size]
+            for m in range(self.n_subvectors):
+                out += tables[:, m, chunk[:, m]]
+        if self.metric == "l2":
+            scores = 2 * scores - self.norms[None, :]
+        return top_k(scores, k)
+
+    def nbytes(self) -> int:
+        extra = self.norms.nbytes if self.norms is not None else 0
+        return self.codes.nbytes + self.codebooks.nbytes + extra
+
+    def save(self, path: str | Path) -> None:
+        np.savez(
+            _npz_path(path),
+            kind="product",
+            metric=self.metric,
+            n_iter=self.n_iter,
+            seed=self.seed,
+            codebooks=self.codebooks,
+            codes=self.codes,
+        )
+
+    @classmethod
+    def load(cls, path: str | Path) -> "ProductQuantizer":
+        with np.load(_npz_path(path)) as data:
+            return cls._from_archive(data)
+
+    @classmethod
+    def _from_archive(cls, data) -> "ProductQuantizer":
+        codebooks = data["codebooks"]
+        quantizer = cls(
+            n_subvectors=codebooks.shape[0],
+            n_centroids=codebooks.shape[1],
+            metric=str(data["metric"]),
+            n_iter=int(data["n_iter"]),
+            seed=int(data["seed"]),
+        )
+        quantizer.codebooks = codebooks
+        return quantizer.add_codes(data["codes"])
+
+
+def batched_search(
+    index: "ScalarQuantizer | ProductQuantizer",
+    queries: np.ndarray,
+    k: int,
+    batch_size: int = 256,
+) -> tuple[np.ndarray, np.ndarray]:
+    "Runs `index.search` over query batches so the score matrix stays bounded."
+    results = [index.search(queries[i : i + batch_size], k) for i in range(0, len(queries), batch_size)]
+    return np.concatenate([r[0] for r in results]), np.concatenate([r[1] for r in results])
+
+
+def load_quantizer(path: str | Path) -> ScalarQuantizer | ProductQuantizer:
+    "Loads a quantized embedding index saved with `.save()`."
+    path = _npz_path(path)
+    with np.load(path) as data:
+        kind = str(data["kind"])
+        if kind == "scalar":
+            return ScalarQuantizer._from_archive(data)
+        if kind == "product":
+            return ProductQuantizer._from_archive(data)
+    raise ValueError(f"Unknown quantizer kind '{kind}' in {path}.")
+
+
+def quantize_embeddings(
+    df: pl.DataFrame,
+    column: str = "embeddings",
+    method: str = "int8",
+    metric: str = "ip",
+    n_subvectors: int = 16,
+) -> ScalarQuantizer | ProductQuantizer:
+    """
+    Builds a quantized, searchable copy of an embedding column, e.g. the output of
+    `generate_embeddings_for_dataframe`. Row i of the index is row i of `df`.
+    With metric 'ip' the embeddings are L2 normalized first, so scores are cosine
+    similarities for normalized queries.
+    """
+    embeddings = embeddings_to_numpy(df, column)
+    if metric == "ip":
+        embeddings = _l2_normalize(embeddings)
+
+    if method == "int8":
+        quantizer = ScalarQuantizer(metric=metric)
+    elif method == "pq":
+        quantizer = ProductQuantizer(n_subvectors=n_subvectors, metric=metric)
+    else:
+        raise ValueError(f"Unsupported quantization method '{method}', use 'int8' or 'pq'.")
+
+    return quantizer.train(embeddings).add(embeddings)
+
+
+def evaluate_quantization(
+    embeddings: np.ndarray,
+    k: int = 10,
+    n_queries: int = 1_000,
+    metric: str = "ip",
+    pq_subvectors: tuple[int, ...] = (8, 16, 32, 64),
+    seed: int = 27,
+) -> pl.DataFrame:
+    """
+    Reports the recall@k versus memory trade-off of every quantization method against
+    exact float32 search, using a random sample of the embeddings as queries.
+    """
+    embeddings = embeddings.astype(np.float32, copy=False)
+    if metric == "ip":
+        embeddings = _l2_normalize(embeddings)
+    rng = np.random.default_rng(seed)
+    queries = embeddings[rng.choice(len(embeddings), min(n_queries, len(embeddings)), replace=False)]
+
+    start = time.perf_counter()
+    truth = np.concatenate(
+        [
+            exact_search(queries[i : i + 256], embeddings, k, metric=metric)[0]
+            for i in range(0, len(queries), 256)
+        ]
+    )
+    results = [
+        {
+            "method": "float32",
+            "bytes": embeddings.nbytes,
+            "compression": 1.0,
+            f"recall@{k}": 1.0,
+            "search_ms_per_query": 1000 * (time.perf_counter() - start) / len(queries),
+        }
+    ]
+
+    candidates: list[tuple[str, ScalarQuantizer | ProductQuantizer]] = [
+        ("int8", ScalarQuantizer(metric=metric))
+    ]
+    for m in pq_subvectors:
+        if embeddings.shape[1] % m == 0:
+            candidates.append((f"pq{m}x8", ProductQuantizer(n_subvectors=m, metric=metric, seed=seed)))
+
+    for name, quantizer in candidates:
+        quantizer.train(embeddings).add(embeddings)
+        start = time.perf_counter()
+        found, _ = batched_search(quantizer, queries, k)
+        elapsed = time.perf_counter() - start
+        hits = (found[:, :, None] == truth[:, None, :]).any(axis=2).sum()
+        results.append(
+            {
+                "method": name,
+                "bytes": quantizer.nbytes(),
+                "compression": embeddings.nbytes / quantizer.nbytes(),
+                f"recall@{k}": hits / truth.size,
+                "search_ms_per_query": 1000 * elapsed / len(queries),
+            }
+        )
+
+    return pl.DataFrame(results)
@@ -0,0 +1,260 @@
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+from loguru import logger
+
+PADDING_CODE = 0
+
+# name -> dtype of the (n_customers, seq_len) matrices kept per shard.
+SEQUENCE_ARRAYS = {
+    "articles": np.int32,
+    "scores": np.int8,
+    "deltas": np.int32,
+}
+
+_META_FILE = "meta.json"
+_CUSTOMERS_FILE = "customers.parquet"
+_ARTICLES_FILE = "articles.parquet"
+
+
+def _tail_events(interactions: pl.DataFrame, seq_len: int) -> pl.DataFrame:
+    """
+    Keeps the last `seq_len` events of every customer row and computes, fully vectorized:
+    - `delta`: seconds since the previous event of the customer (or since `prev_t_dat`).
+    - `n_new`: how many events the customer keeps, at most `seq_len`.
+    - `position`: the event's index among the kept events, oldest first.
+    Expects the columns row, code, interaction_score, t_dat (epoch ms) and prev_t_dat.
+    """
+    return (
+        interactions.sort(["row", "t_dat"])
+        .with_columns(
+            prev=pl.col("t_dat").shift(1).over("row"),
+            n=pl.len().over("row").cast(pl.Int64),
+            idx=pl.int_range(pl.len(), dtype=pl.Int64).over("row"),
+        )
+        .with_columns(
+            delta=(
+                (pl.col("t_dat") - pl.coalesce("prev", "prev_t_dat", "t_dat")) // 1000
+            )
+            .clip(0, np.iinfo(np.int32).max)
+            .cast(pl.Int32),
+            n_new=pl.min_horizontal("n", pl.lit(seq_len, dtype=pl.Int64)),
+        )
+        .filter(pl.col("idx") >= pl.col("n") - seq_len)
+        .with_columns(position=pl.col("idx") - (pl.col("n") - pl.col("n_new")))
+        .select("row", "code", "interaction_score", "delta", "n_new", "position", "t_dat")
+    )
+
+
+class SequenceStore:
+    """
+    Fixed-length, right-aligned interaction histories per customer, stored as
+    memory-mapped `.npy` shards of `shard_size` customers:
+
+    - `articles`: int32 article codes, 0 is padding (see `article_index`).
+    - `scores`: int8 interaction scores, 0 = ignore, 1 = click, 2 = purchase.
+    - `deltas`: int32 seconds since the customer's previous interaction.
+
+    Padding positions are the ones where `articles == 0`, the newest event is the last column.
+    """
+
+    def __init__(self, directory: str | Path) -> None:
+        self.directory = Path(directory)
+        with (self.directory / _META_FILE).open("r", encoding="utf-8") as f:
+            meta = json.load(f)
+        self.seq_len: int = meta["seq_len"]
+        self.shard_size: int = meta["shard_size"]
+        self.customer_index = pl.read_parquet(self.directory / _CUSTOMERS_FILE)
+        self.article_index = pl.read_parquet(self.directory / _ARTICLES_FILE)
+
+    @property
+    def n_customers(self) -> int:
+        return len(self.customer_index)
+
+    @property
+    def n_shards(self) -> int:
+        return -(-self.n_customers // self.shard_size)
+
+    def _shard_path(self, name: str, shard: int) -> Path:
+        return self.directory / f"{name}_{shard:05d}.npy"
+
+    def _shard_rows(self, shard: int) -> int:
+        return min(self.shard_size, self.n_customers - shard * self.shard_size)
+
+    @classmethod
+    def build(
+        cls,
+        interactions: pl.DataFrame,
+        directory: str | Path,
+        seq_len: int = 50,
+        shard_size: int = 100_000,
+    ) -> "SequenceStore":
+        """
+        Builds the store from an interactions frame (customer_id, article_id, t_dat,
+        interaction_score), e.g. the output of `generate_interaction_data`.
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        empty_customers = pl.DataFrame(
+            schema={"customer_id": pl.Utf8, "row": pl.Int64, "last_t_dat": pl.Int64}
+        )
+        empty_articles = pl.DataFrame(schema={"article_id": pl.Utf8, "code": pl.Int32})
+        empty_customers.write_parquet(directory / _CUSTOMERS_FILE)
+        empty_articles.write_parquet(directory / _ARTICLES_FILE)
+        with (directory / _META_FILE).open("w", encoding="utf-8") as f:
+            json.dump({"seq_len": seq_len, "shard_size": shard_size}, f)
+        for path in directory.glob("*_*.npy"):
+            path.unlink()
+
+        store = cls(directory)
+        store.append(interactions)
+        return store
+
+    def append(self, interactions: pl.DataFrame) -> None:
+        """
+        Appends new events without rebuilding the store. Existing histories are shifted
+        left by the number of new events of the customer, new customers get new rows.
+        Events are assumed to be newer than everything already stored for the customer.
+        """
+        events = interactions.select(
+            pl.col("customer_id").cast(pl.Utf8),
+            pl.col("article_id").cast(pl.Utf8),
+            pl.col("t_dat").cast(pl.Int64),
+            pl.col("interaction_score").cast(pl.Int8),
+        )
+        if events.is_empty():
+            return
+
+        self._extend_indexes(events)
+        events = events.join(
+            self.customer_index.rename({"last_t_dat": "prev_t_dat"}), on="customer_id"
+        ).join(self.article_index, on="article_id")
+        tail = _tail_events(events, self.seq_len)
+
+        self._grow_shards()
+        seq_len = self.seq_len
+        columns = np.arange(seq_len)
+        tail = tail.with_columns(shard=pl.col("row") // self.shard_size)
+        for (shard,), shard_events in tail.group_by("shard"):
+            rows = shard_events.select("row", "n_new").unique("row").sort("row")
+            offsets = rows["row"].to_numpy() - shard * self.shard_size
+            n_new = rows["n_new"].to_numpy()
+            # Map every event to the rank of its customer within this shard.
+            local = np.searchsorted(rows["row"].to_numpy(), shard_events["row"].to_numpy())
+            positions = shard_events["position"].to_numpy()
+
+            for name, values in (
+                ("articles", shard_events["code"].to_numpy()),
+                ("scores", shard_events["interaction_score"].to_numpy()),
+                ("deltas", shard_events["delta"].to_numpy()),
+            ):
+                matrix = np.lib.format.open_memmap(self._shard_path(name, shard), mode="r+")
+                # [old history | new events left aligned], then a window of seq_len
+                # ending right after the last new event of every customer.
+                combined = np.zeros((len(offsets), 2 * seq_len), dtype=matrix.dtype)
+                combined[:, :seq_len] = matrix[offsets]
+                combined[local, seq_len + positions] = values
+                window = n_new[:, None] + columns[None, :]
+                matrix[offsets] = np.take_along_axis(combined, window, axis=1)
+                matrix.flush()
+                del matrix
+
+        last_t_dat = tail.group_by("row").agg(pl.col("t_dat").max().alias("new_last_t_dat"))
+        self.customer_index = (
+            self.customer_index.join(last_t_dat, on="row", how="left")
+            .with_columns(last_t_dat=pl.coalesce("new_last_t_dat", "last_t_dat"))
+            .drop("new_last_t_dat")
+        )
+        self._write_index(self.customer_index, _CUSTOMERS_FILE)
+        logger.info(
+            f"Appended {len(events)} events for {tail['row'].n_unique()} customers "
+            f"({self.n_customers} customers, {len(self.article_index)} articles in store)."
+        )
+
+    def _extend_indexes(self, events: pl.DataFrame) -> None:
+        new_articles = (
+            events.select("article_id")
+            .unique(maintain_order=True)
+            .join(self.article_index, on="article_id", how="anti")
+        )
+        if not new_articles.is_empty():
+            first_code = len(self.article_index) + 1  # 0 is padding
+            new_articles = new_articles.with_columns(
+                code=pl.int_range(first_code, first_code + len(new_articles), dtype=pl.Int32)
+            )
+            self.article_index = pl.concat([self.article_index, new_articles])
+            self._write_index(self.article_index, _ARTICLES_FILE)
+
+        new_customers = (
+            events.select("customer_id")
+            .unique(maintain_order=True)
+            .join(self.customer_index, on="customer_id", how="anti")
+        )
+        if not new_customers.is_empty():
+            first_row = self.n_customers
+            new_customers = new_customers.with_columns(
+                row=pl.int_range(first_row, first_row + len(new_customers), dtype=pl.Int64),
+                last_t_dat=pl.lit(None, dtype=pl.Int64),
+            )
+            # Only persisted together with the shards in `append`.
+            self.customer_index = pl.concat([self.customer_index, new_customers])
+
+    def _grow_shards(self) -> None:
+        "Makes sure every shard exists with room for all customers of the index."
+        for shard in range(self.n_shards):
+            rows = self._shard_rows(shard)
+            for name, dtype in SEQUENCE_ARRAYS.items():
+                path = self._shard_path(name, shard)
+                if not path.exists():
+                    np.lib.format.open_memmap(
+                        path, mode="w+", dtype=dtype, shape=(rows, self.seq_len)
+                    ).flush()
+                    continue
+                current = np.load(path, mmap_mode="r")
+                if current.shape[0] == rows:
+                    continue
+                # Only the last shard can be partially filled, rewrite it with more rows.
+                tmp_path = path.with_suffix(".tmp.npy")
+                grown = np.lib.format.open_memmap(
+                    tmp_path, mode="w+", dtype=dtype, shape=(rows, self.seq_len)
+                )
+                grown[: current.shape[0]] = current
+                grown.flush()
+                del grown, current
+                os.replace(tmp_path, path)
+
+    def _write_index(self, df: pl.DataFrame, file_name: str) -> None:
+        tmp_path = self.directory / f"{file_name}.tmp"
+        df.write_parquet(tmp_path)
+        os.replace(tmp_path, self.directory / file_name)
+
+    def shards(self, name: str) -> list[np.ndarray]:
+        "Read-only memory maps of every shard of `name` ('articles', 'scores' or 'deltas')."
+        return [
+            np.load(self._shard_path(name, shard), mmap_mode="r")
+            for shard in range(self.n_shards)
+        ]
+
+    def get(self, customer_ids: list[str]) -> dict[str, np.ndarray]:
+        "Gathers the sequences of the given customers, unknown customers get all padding."
+        rows = (
+            pl.DataFrame({"customer_id": customer_ids}, schema={"customer_id": pl.Utf8})
+            .join(self.customer_index, on="customer_id", how="left")["row"]
+            .to_numpy()
+        )
+        known = ~np.isnan(rows) if rows.dtype.kind == "f" else np.ones(len(rows), dtype=bool)
+        rows = np.where(known, rows, 0).astype(np.int64)
+
+        result = {}
+        for name, dtype in SEQUENCE_ARRAYS.items():
+            out = np.zeros((len(rows), self.seq_len), dtype=dtype)
+            shards = self.shards(name)
+            shard_ids = rows // self.shard_size
+            for shard in np.unique(shard_ids[known]):
+                mask = known & (shard_ids == shard)
+                out[mask] = shards[shard][rows[mask] - shard * self.shard_size]
+            result[name] = out
+        return result
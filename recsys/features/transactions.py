@@ -1,13 +1,25 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
 import numpy as np
-import pandas as pd
 import polars as pl
 
+from recsys.features.profiling import check_profile
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+TRANSACTION_KEY_COLUMNS = ["customer_id", "article_id", "t_dat"]
+
 def convert_article_id_to_str(df: pl.DataFrame) -> pl.Series:
     "Convert the 'article_id' column to string type"
     return df["article_id"].cast(pl.Utf8)
 
 def convert_t_dat_to_datetime(df: pl.DataFrame) -> pl.Series:
     "Convert the t_dat columns to datetime type"
+    import pandas as pd
+
     return pl.from_pandas(pd.to_datetime(df["t_dat"].to_pandas()))
 
 def get_year_feature(df: pl.DataFrame) -> pl.Series:
@@ -47,14 +59,26 @@ def month_sin(month :pd.Series):
 def month_cos(month :pd.Series):
     return np.cos(month * (2 * np.pi / 12))
     
-def compute_features_transactions(df: pl.DataFrame) -> pl.DataFrame:
+def compute_features_transactions(
+        df: pl.DataFrame, profile: pl.DataFrame | None = None
+) -> pl.DataFrame:
     """
     1.Converts 'article_id' to string type.
     2. Converts 't_dat' to datetime type.
     3. Extracts year, month, day, and day of week from 't_dat'.
     4. Calculates sine and cosine of the month for cyclical feature encoding.
     5. Converts 't_dat' to epoch milliseconds.
+
+    With a column `profile` of the input df, the key columns are checked to be
+    present and complete before any feature is computed.
     """
+    if profile is not None:
+        failures = check_profile(
+            profile, required_columns=TRANSACTION_KEY_COLUMNS, not_null=TRANSACTION_KEY_COLUMNS
+        )
+        if failures:
+            raise ValueError(" ".join(failures))
+
     return (
         df.with_columns(
             [
@@ -0,0 +1,233 @@
+import contextlib
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+
+import numpy as np
+import polars as pl
+from loguru import logger
+
+from recsys.features.transactions import month_cos, month_sin
+
+# Feature order of the `ranking` feature view, see `create_ranking_feature_views`.
+RANKING_CUSTOMER_FEATURES = ["age"]
+RANKING_ARTICLE_FEATURES = [
+    "product_type_name",
+    "product_group_name",
+    "graphical_appearance_name",
+    "colour_group_name",
+    "perceived_colour_value_name",
+    "perceived_colour_master_name",
+    "department_name",
+    "index_name",
+    "index_group_name",
+    "section_name",
+    "garment_group_name",
+]
+RANKING_CONTEXT_FEATURES = ["month_sin", "month_cos"]
+
+
+class StageTimer:
+    "Accumulates wall clock time per named stage."
+
+    def __init__(self) -> None:
+        self.timings: dict[str, float] = {}
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - start
+
+    def as_ms(self) -> dict[str, float]:
+        return {name: 1000 * seconds for name, seconds in self.timings.items()}
+
+
+@dataclass
+class RankingResult:
+    top_k: pl.DataFrame
+    timings: dict[str, float] = field(default_factory=dict)
+
+
+def _column_array(series: pl.Series, categorical: bool) -> np.ndarray:
+    if categorical:
+        return series.cast(pl.Utf8).fill_null("UNKNOWN").to_numpy().astype(object)
+    return series.cast(pl.Float64).to_numpy()
+
+
+class ArticleFeatureCache:
+    """
+    Article features already converted to the column arrays CatBoost consumes.
+    Articles are added on first request and reused by every later batch.
+    """
+
+    def __init__(self, articles_df: pl.DataFrame, features: list[str]) -> None:
+        self._source = articles_df.select(
+            pl.col("article_id").cast(pl.Utf8), *features
+        ).unique("article_id", keep="last")
+        self._features = features
+        # Decided once from the source schema so every batch produces the same array dtype.
+        self.categorical = {
+            name: not self._source.schema[name].is_numeric() for name in features
+        }
+        self._index = pl.DataFrame(schema={"article_id": pl.Utf8, "article_row": pl.Int64})
+        self.arrays: dict[str, np.ndarray] = {
+            name: np.empty(0, dtype=object if self.categorical[name] else np.float64)
+            for name in features
+        }
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def rows(self, article_ids: pl.Series) -> pl.DataFrame:
+        "Returns (article_id, article_row) for the known articles, caching new ones first."
+        requested = article_ids.cast(pl.Utf8).unique().to_frame("article_id")
+        missing = requested.join(self._index, on="article_id", how="anti")
+        if not missing.is_empty():
+            new = self._source.join(missing, on="article_id", how="semi")
+            first_row = len(self._index)
+            self._index = pl.concat(
+                [
+                    self._index,
+                    new.select(
+                        "article_id",
+                        article_row=pl.int_range(first_row, first_row + len(new), dtype=pl.Int64),
+                    ),
+                ]
+            )
+            for name in self._features:
+                self.arrays[name] = np.concatenate(
+                    [self.arrays[name], _column_array(new[name], categorical=self.categorical[name])]
+                )
+        return requested.join(self._index, on="article_id", how="inner")
+
+
+class BatchRanker:
+    """
+    Scores (customer, candidate articles) lists with a CatBoost ranking model in large,
+    multi-threaded `predict` calls and keeps the top-k per customer.
+    The feature matrix is assembled with a single vectorized gather from the customer
+    table and the article feature cache instead of per-customer lookups.
+    """
+
+    def __init__(
+        self,
+        model,
+        customers_df: pl.DataFrame,
+        articles_df: pl.DataFrame,
+        customer_features: list[str] | None = None,
+        article_features: list[str] | None = None,
+        thread_count: int = -1,
+        predict_batch_size: int = 500_000,
+    ) -> None:
+        self.model = model
+        self.customer_features = customer_features or RANKING_CUSTOMER_FEATURES
+        self.article_features = article_features or RANKING_ARTICLE_FEATURES
+        self.thread_count = thread_count
+        self.predict_batch_size = predict_batch_size
+
+        model_features = getattr(model, "feature_names_", None)
+        self.feature_names = list(model_features) if model_features else (
+            self.customer_features + self.article_features + RANKING_CONTEXT_FEATURES
+        )
+
+        customers = customers_df.select(
+            pl.col("customer_id").cast(pl.Utf8), *self.customer_features
+        ).unique("customer_id", keep="last", maintain_order=True)
+        self._customer_index = customers.select(
+            "customer_id", customer_row=pl.int_range(pl.len(), dtype=pl.Int64)
+        )
+        categorical = {
+            name: not customers[name].dtype.is_numeric() for name in self.customer_features
+        }
+        self._customer_arrays = {
+            name: _column_array(customers[name], categorical=categorical[name])
+            for name in self.customer_features
+        }
+        self.article_cache = ArticleFeatureCache(articles_df, self.article_features)
+        categorical.update(self.article_cache.categorical)
+        # Taken from the source schemas rather than the pandas frame, whose dtype for
+        # strings depends on the pandas version (object before 3.0, str after).
+        self.cat_features = [name for name in self.feature_names if categorical.get(name, False)]
+
+    def _assemble(self, candidates: pl.DataFrame, month: int):
+        import pandas as pd
+
+        customer_rows = candidates["customer_row"].to_numpy()
+        article_rows = candidates["article_row"].to_numpy()
+        columns = {}
+        for name in self.feature_names:
+            if name in self._customer_arrays:
+                columns[name] = self._customer_arrays[name][customer_rows]
+            elif name in self.article_cache.arrays:
+                columns[name] = self.article_cache.arrays[name][article_rows]
+            elif name == "month_sin":
+                columns[name] = np.full(len(candidates), month_sin(month))
+            elif name == "month_cos":
+                columns[name] = np.full(len(candidates), month_cos(month))
+            else:
+                raise ValueError(f"No source for ranking feature '{name}'.")
+        return pd.DataFrame(columns, columns=self.feature_names)
+
+    def _predict(self, features) -> np.ndarray:
+        from catboost import Pool
+
+        scores = []
+        for start in range(0, len(features), self.predict_batch_size):
+            pool = Pool(
+                features.iloc[start : start + self.predict_batch_size],
+                cat_features=self.cat_features,
+            )
+            probabilities = self.model.predict(
+                pool, prediction_type="Probability", thread_count=self.thread_count
+            )
+            scores.append(np.asarray(probabilities)[:, 1])
+        return np.concatenate(scores) if scores else np.empty(0)
+
+    def rank(
+        self, candidates: pl.DataFrame, k: int = 12, month: int | None = None
+    ) -> RankingResult:
+        """
+        `candidates` has a customer_id column and an article_id column, either one row per
+        pair or a list of candidate articles per customer. Returns the k best articles per
+        customer (customer_id, article_id, score, rank) and the latency of every stage.
+        """
+        timer = StageTimer()
+        month = month or datetime.now().month
+
+        with timer.stage("prepare"):
+            if isinstance(candidates.schema["article_id"], pl.List):
+                candidates = candidates.explode("article_id")
+            candidates = candidates.select(
+                pl.col("customer_id").cast(pl.Utf8), pl.col("article_id").cast(pl.Utf8)
+            ).drop_nulls()
+
+        with timer.stage("article_cache"):
+            article_rows = self.article_cache.rows(candidates["article_id"])
+
+        with timer.stage("gather"):
+            joined = candidates.join(self._customer_index, on="customer_id", how="inner").join(
+                article_rows, on="article_id", how="inner"
+            )
+            if len(joined) < len(candidates):
+                logger.warning(
+                    f"Dropped {len(candidates) - len(joined)} candidates with unknown customers or articles."
+                )
+            features = self._assemble(joined, month)
+
+        with timer.stage("predict"):
+            scores = self._predict(features)
+
+        with timer.stage("top_k"):
+            top_k = (
+                joined.select("customer_id", "article_id")
+                .with_columns(score=pl.Series(scores, dtype=pl.Float64))
+                .sort(["customer_id", "score"], descending=[False, True])
+                .group_by("customer_id", maintain_order=True)
+                .head(k)
+                .with_columns(rank=pl.int_range(1, pl.len() + 1).over("customer_id"))
+            )
+
+        return RankingResult(top_k=top_k, timings=timer.as_ms())
@@ -0,0 +1,402 @@
+"""
+Two-stage recommendation serving against local stores: look up the customer, retrieve
+candidates by embedding similarity, drop already purchased articles, rank, with requests
+gathered into micro-batches within a latency budget.
+
+    python -m recsys.inference.serving serve --customers c.parquet --articles a.parquet --transactions t.parquet
+    python -m recsys.inference.serving replay --requests requests.jsonl --generate 10000 --qps 500 ...
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+from loguru import logger
+
+from recsys.features.quantization import embeddings_to_numpy, top_k
+from recsys.inference.ranking import BatchRanker, StageTimer
+
+
+@dataclass
+class LocalStores:
+    """
+    In-memory replacements of the online feature store for one serving replica.
+    Query embeddings default to the mean embedding of the articles a customer bought,
+    customers without history fall back to the mean of all purchases.
+    """
+
+    customer_ids: list[str]
+    customer_rows: dict[str, int]
+    query_embeddings: np.ndarray
+    article_ids: np.ndarray
+    article_embeddings: np.ndarray
+    purchased_indptr: np.ndarray
+    purchased_indices: np.ndarray
+    fallback_query: np.ndarray
+
+    @classmethod
+    def from_frames(
+        cls,
+        customers_df: pl.DataFrame,
+        articles_df: pl.DataFrame,
+        transactions_df: pl.DataFrame,
+        embedding_column: str = "embeddings",
+    ) -> "LocalStores":
+        articles = articles_df.select(
+            pl.col("article_id").cast(pl.Utf8), embedding_column
+        ).unique("article_id", keep="last", maintain_order=True)
+        article_embeddings = embeddings_to_numpy(articles, embedding_column)
+        article_embeddings /= np.maximum(
+            np.linalg.norm(article_embeddings, axis=1, keepdims=True), 1e-12
+        )
+
+        customers = customers_df.select(pl.col("customer_id").cast(pl.Utf8)).unique(maintain_order=True)
+        purchases = (
+            transactions_df.select(
+                pl.col("customer_id").cast(pl.Utf8), pl.col("article_id").cast(pl.Utf8)
+            )
+            .unique()
+            .join(customers.with_row_index("customer_row"), on="customer_id")
+            .join(articles.select("article_id").with_row_index("article_row"), on="article_id")
+            .sort("customer_row", "article_row")
+        )
+        customer_rows = purchases["customer_row"].to_numpy().astype(np.int64)
+        article_rows = purchases["article_row"].to_numpy().astype(np.int64)
+
+        # CSR layout: purchases of customer i are indices[indptr[i]:indptr[i + 1]].
+        counts = np.bincount(customer_rows, minlength=len(customers))
+        indptr = np.concatenate([[0], np.cumsum(counts)])
+
+        query_embeddings = np.zeros((len(customers), article_embeddings.shape[1]), dtype=np.float32)
+        np.add.at(query_embeddings, customer_rows, article_embeddings[article_rows])
+        fallback = article_embeddings[article_rows].mean(axis=0) if len(article_rows) else article_embeddings.mean(axis=0)
+        query_embeddings[counts == 0] = fallback
+        query_embeddings /= np.maximum(np.linalg.norm(query_embeddings, axis=1, keepdims=True), 1e-12)
+
+        customer_ids = customers["customer_id"].to_list()
+        return cls(
+            customer_ids=customer_ids,
+            customer_rows={customer_id: i for i, customer_id in enumerate(customer_ids)},
+            query_embeddings=query_embeddings,
+            article_ids=articles["article_id"].to_numpy(),
+            article_embeddings=article_embeddings,
+            purchased_indptr=indptr,
+            purchased_indices=article_rows,
+            fallback_query=fallback / max(np.linalg.norm(fallback), 1e-12),
+        )
+
+
+class TwoStageRecommender:
+    "Retrieval by embedding similarity, purchased-article filtering, then optional ranking."
+
+    def __init__(
+        self,
+        stores: LocalStores,
+        ranker: BatchRanker | None = None,
+        index=None,
+        n_candidates: int = 100,
+    ) -> None:
+        self.stores = stores
+        self.ranker = ranker
+        # Optional quantized index over the article embeddings, see `recsys.features.quantization`.
+        self.index = index
+        self.n_candidates = n_candidates
+
+    def recommend_batch(
+        self, customer_ids: list[str], k: int = 12
+    ) -> tuple[list[list[str]], dict[str, float]]:
+        timer = StageTimer()
+        stores = self.stores
+
+        with timer.stage("lookup"):
+            rows = np.array([stores.customer_rows.get(c, -1) for c in customer_ids], dtype=np.int64)
+            known = rows >= 0
+            queries = np.where(
+                known[:, None], stores.query_embeddings[np.maximum(rows, 0)], stores.fallback_query
+            ).astype(np.float32)
+
+        # Over-fetch so that filtering purchases still leaves n_candidates per customer.
+        purchased_counts = np.where(
+            known, np.diff(stores.purchased_indptr)[np.maximum(rows, 0)], 0
+        )
+        n_retrieve = min(self.n_candidates + int(purchased_counts.max(initial=0)), len(stores.article_ids))
+
+        with timer.stage("retrieve"):
+            if self.index is not None:
+                candidate_rows, scores = self.index.search(queries, n_retrieve)
+            else:
+                candidate_rows, scores = top_k(queries @ stores.article_embeddings.T, n_retrieve)
+
+        with timer.stage("filter"):
+            purchased = np.zeros(candidate_rows.shape, dtype=bool)
+            for i in np.flatnonzero(purchased_counts):
+                start, end = stores.purchased_indptr[rows[i]], stores.purchased_indptr[rows[i] + 1]
+                purchased[i] = np.isin(candidate_rows[i], stores.purchased_indices[start:end])
+            scores = np.where(purchased, -np.inf, scores)
+            order = np.argsort(-scores, axis=1, kind="stable")[:, : self.n_candidates]
+            candidate_rows = np.take_along_axis(candidate_rows, order, axis=1)
+            valid = np.take_along_axis(~purchased, order, axis=1)
+            candidates = [
+                stores.article_ids[candidate_rows[i][valid[i]]].tolist() for i in range(len(customer_ids))
+            ]
+
+        if self.ranker is None:
+            return [c[:k] for c in candidates], timer.as_ms()
+
+        with timer.stage("rank"):
+            result = self.ranker.rank(
+                pl.DataFrame(
+                    {"customer_id": customer_ids, "article_id": candidates},
+                    schema={"customer_id": pl.Utf8, "article_id": pl.List(pl.Utf8)},
+                ),
+                k=k,
+            )
+            ranked = dict(
+                result.top_k.group_by("customer_id", maintain_order=True)
+                .agg("article_id")
+                .iter_rows()
+            )
+            # Customers the ranker knows nothing about keep the retrieval order.
+            recommendations = [ranked.get(c, candidates[i][:k]) for i, c in enumerate(customer_ids)]
+        timings = timer.as_ms()
+        for stage, ms in result.timings.items():
+            timings[f"rank.{stage}"] = ms
+        return recommendations, timings
+
+
+class LatencyReport:
+    "Collects per-request and per-stage latencies and summarizes them as p50/p99 and QPS."
+
+    def __init__(self) -> None:
+        self.stages: dict[str, list[float]] = defaultdict(list)
+        self.batch_sizes: list[int] = []
+        self.started = time.perf_counter()
+        self.n_requests = 0
+
+    def record_batch(self, size: int, timings: dict[str, float]) -> None:
+        self.batch_sizes.append(size)
+        for stage, ms in timings.items():
+            self.stages[stage].append(ms)
+
+    def record_request(self, queue_ms: float, total_ms: float) -> None:
+        self.n_requests += 1
+        self.stages["queue"].append(queue_ms)
+        self.stages["end_to_end"].append(total_ms)
+
+    def summary(self) -> dict:
+        elapsed = time.perf_counter() - self.started
+        return {
+            "requests": self.n_requests,
+            "qps": self.n_requests / elapsed if elapsed > 0 else 0.0,
+            "mean_batch_size": float(np.mean(self.batch_sizes)) if self.batch_sizes else 0.0,
+            "stages_ms": {
+                stage: {
+                    "p50": float(np.percentile(values, 50)),
+                    "p99": float(np.percentile(values, 99)),
+                }
+                for stage, values in self.stages.items()
+                if values
+            },
+        }
+
+
+class MicroBatcher:
+    """
+    Gathers concurrent requests into batches of at most `max_batch_size`, waiting no longer
+    than `max_wait_ms` after the first request of a batch, and runs each batch in a worker
+    thread so the event loop keeps accepting requests.
+    """
+
+    def __init__(
+        self,
+        recommender: TwoStageRecommender,
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5.0,
+        report: LatencyReport | None = None,
+    ) -> None:
+        self.recommender = recommender
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.report = report or LatencyReport()
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._worker: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    async def recommend(self, customer_id: str, k: int = 12) -> list[str]:
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((customer_id, k, time.perf_counter(), future))
+        return await future
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            dispatched = time.perf_counter()
+            k = max(item[1] for item in batch)
+            try:
+                recommendations, timings = await asyncio.to_thread(
+                    self.recommender.recommend_batch, [item[0] for item in batch], k
+                )
+            except Exception as e:
+                logger.exception("Recommendation batch failed.")
+                for *_, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            done = time.perf_counter()
+            self.report.record_batch(len(batch), timings)
+            for (_, request_k, enqueued, future), articles in zip(batch, recommendations):
+                self.report.record_request(1000 * (dispatched - enqueued), 1000 * (done - enqueued))
+                if not future.done():
+                    future.set_result(articles[:request_k])
+
+
+def create_app(batcher: MicroBatcher):
+    "aiohttp application: POST /recommend {'customer_id', 'k'} and GET /stats."
+    from aiohttp import web
+
+    async def recommend(request: web.Request) -> web.Response:
+        payload = await request.json()
+        articles = await batcher.recommend(str(payload["customer_id"]), int(payload.get("k", 12)))
+        return web.json_response({"customer_id": payload["customer_id"], "article_ids": articles})
+
+    async def stats(request: web.Request) -> web.Response:
+        return web.json_response(batcher.report.summary())
+
+    async def on_startup(app: web.Application) -> None:
+        batcher.start()
+
+    async def on_cleanup(app: web.Application) -> None:
+        await batcher.stop()
+
+    app = web.Application()
+    app.add_routes([web.post("/recommend", recommend), web.get("/stats", stats)])
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    return app
+
+
+def write_requests_file(customers_df: pl.DataFrame, path: str | Path, n: int, k: int = 12, seed: int = 27) -> None:
+    "Writes a JSONL replay file of `n` requests for randomly drawn customers."
+    customer_ids = customers_df["customer_id"].cast(pl.Utf8).sample(n, with_replacement=True, seed=seed)
+    with Path(path).open("w", encoding="utf-8") as f:
+        for customer_id in customer_ids:
+            f.write(json.dumps({"customer_id": customer_id, "k": k}) + "\n")
+
+
+async def replay(batcher: MicroBatcher, requests_path: str | Path, qps: float | None = None) -> dict:
+    """
+    Open-loop load generator: sends the JSONL requests at `qps` (as fast as possible when
+    None) through the micro-batcher and returns the latency report.
+    """
+    with Path(requests_path).open("r", encoding="utf-8") as f:
+        requests = [json.loads(line) for line in f if line.strip()]
+
+    batcher.report = LatencyReport()
+    batcher.start()
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+
+    async def send(i: int, request: dict) -> None:
+        if qps:
+            await asyncio.sleep(max(0.0, started + i / qps - loop.time()))
+        await batcher.recommend(str(request["customer_id"]), int(request.get("k", 12)))
+
+    await asyncio.gather(*(send(i, request) for i, request in enumerate(requests)))
+    await batcher.stop()
+    return batcher.report.summary()
+
+
+def _read_frame(path: str) -> pl.DataFrame:
+    return pl.read_parquet(path) if path.endswith(".parquet") else pl.read_csv(path, try_parse_dates=True)
+
+
+def build_batcher(args: argparse.Namespace) -> MicroBatcher:
+    customers_df = _read_frame(args.customers)
+    articles_df = _read_frame(args.articles)
+    stores = LocalStores.from_frames(customers_df, articles_df, _read_frame(args.transactions))
+
+    ranker = None
+    if args.ranker_model:
+        from catboost import CatBoostClassifier
+
+        model = CatBoostClassifier()
+        model.load_model(args.ranker_model)
+        ranker = BatchRanker(model, customers_df, articles_df)
+
+    index = None
+    if args.quantized_index:
+        from recsys.features.quantization import load_quantizer
+
+        index = load_quantizer(args.quantized_index)
+
+    recommender = TwoStageRecommender(stores, ranker=ranker, index=index, n_candidates=args.n_candidates)
+    return MicroBatcher(recommender, max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("mode", choices=["serve", "replay"])
+    parser.add_argument("--customers", required=True, help="Customer features (parquet or csv).")
+    parser.add_argument("--articles", required=True, help="Article features with an 'embeddings' column.")
+    parser.add_argument("--transactions", required=True, help="Purchases used for query embeddings and filtering.")
+    parser.add_argument("--ranker-model", help="CatBoost ranking model file, retrieval order is used without it.")
+    parser.add_argument(
+        "--quantized-index",
+        help="Quantized index saved by recsys.features.quantization, built from the same --articles rows.",
+    )
+    parser.add_argument("--n-candidates", type=int, default=100)
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--requests", help="JSONL file of {'customer_id', 'k'} requests to replay.")
+    parser.add_argument("--generate", type=int, help="Write this many random requests to --requests first.")
+    parser.add_argument("--qps", type=float, help="Target replay rate, unthrottled when omitted.")
+    args = parser.parse_args()
+
+    batcher = build_batcher(args)
+    if args.mode == "serve":
+        from aiohttp import web
+
+        web.run_app(create_app(batcher), host=args.host, port=args.port)
+        return
+
+    if not args.requests:
+        parser.error("replay needs --requests")
+    if args.generate:
+        write_requests_file(_read_frame(args.customers), args.requests, args.generate)
+    print(json.dumps(asyncio.run(replay(batcher, args.requests, args.qps)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
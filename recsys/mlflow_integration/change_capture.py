@@ -0,0 +1,174 @@
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+
+import polars as pl
+from loguru import logger
+
+FINGERPRINT_COLUMN = "__fingerprint"
+
+# Fixed seeds so fingerprints are comparable between runs.
+_HASH_SEEDS = (0x5EED, 0x0DD5, 0xC0DE, 0xFACE)
+# Bumped whenever the way rows are hashed changes, which invalidates older snapshots.
+_FINGERPRINT_VERSION = 2
+
+
+@dataclass
+class ChangeSet:
+    "Rows to upsert and keys to delete for one feature group ingestion."
+
+    upserts: pl.DataFrame
+    deletes: pl.DataFrame
+    fingerprints: pl.DataFrame
+    n_inserts: int
+    n_updates: int
+    n_unchanged: int
+
+    @property
+    def n_deletes(self) -> int:
+        return len(self.deletes)
+
+    def summary(self) -> dict[str, int]:
+        return {
+            "inserts": self.n_inserts,
+            "updates": self.n_updates,
+            "deletes": self.n_deletes,
+            "unchanged": self.n_unchanged,
+        }
+
+
+def compute_row_fingerprints(
+    df: pl.DataFrame, primary_key: list[str], feature_columns: list[str] | None = None
+) -> pl.DataFrame:
+    """
+    Hashes the feature columns of every row into a 64 bit fingerprint, vectorized over the
+    whole frame. Rows sharing a primary key keep the last occurrence, like an upsert would.
+    """
+    feature_columns = feature_columns or [c for c in df.columns if c not in primary_key]
+    # Hashing a struct of the raw columns is not supported for list columns (e.g. embeddings),
+    # so every column is hashed on its own and the struct of u64 hashes is hashed again.
+    column_hashes = [pl.col(c).hash(*_HASH_SEEDS).alias(c) for c in feature_columns]
+    return (
+        df.select(
+            *primary_key,
+            pl.struct(column_hashes).hash(*_HASH_SEEDS).alias(FINGERPRINT_COLUMN),
+        )
+        .unique(subset=primary_key, keep="last", maintain_order=True)
+    )
+
+
+def _metadata_path(snapshot_path: Path) -> Path:
+    return snapshot_path.with_suffix(".json")
+
+
+def _snapshot_metadata(primary_key: list[str], feature_columns: list[str]) -> dict:
+    # Polars does not guarantee hash stability across versions, so record the version.
+    return {
+        "fingerprint_version": _FINGERPRINT_VERSION,
+        "polars_version": pl.__version__,
+        "primary_key": primary_key,
+        "feature_columns": feature_columns,
+    }
+
+
+def load_snapshot(
+    snapshot_path: str | Path, primary_key: list[str], feature_columns: list[str]
+) -> pl.DataFrame | None:
+    """
+    Loads the fingerprints persisted by the previous ingestion, or None when there is no
+    snapshot or it was computed with another polars version, key or set of feature columns.
+    """
+    snapshot_path = Path(snapshot_path)
+    metadata_path = _metadata_path(snapshot_path)
+    if not snapshot_path.exists() or not metadata_path.exists():
+        return None
+
+    with metadata_path.open("r", encoding="utf-8") as f:
+        metadata = json.load(f)
+    if metadata != _snapshot_metadata(primary_key, feature_columns):
+        logger.warning(
+            f"Fingerprint snapshot {snapshot_path} is incompatible with the current frame, "
+            "falling back to a full ingestion."
+        )
+        return None
+
+    return pl.read_parquet(snapshot_path)
+
+
+def save_snapshot(
+    fingerprints: pl.DataFrame,
+    snapshot_path: str | Path,
+    primary_key: list[str],
+    feature_columns: list[str],
+) -> None:
+    snapshot_path = Path(snapshot_path)
+    snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = snapshot_path.with_suffix(".tmp")
+    fingerprints.write_parquet(tmp_path)
+    os.replace(tmp_path, snapshot_path)
+    with _metadata_path(snapshot_path).open("w", encoding="utf-8") as f:
+        json.dump(_snapshot_metadata(primary_key, feature_columns), f)
+
+
+def diff_fingerprints(
+    previous: pl.DataFrame, current: pl.DataFrame, primary_key: list[str]
+) -> pl.DataFrame:
+    "Full outer join of two fingerprint frames, labelling every key insert/update/delete/unchanged."
+    return (
+        previous.join(current, on=primary_key, how="full", coalesce=True, suffix="_new")
+        .select(
+            *primary_key,
+            pl.when(pl.col(FINGERPRINT_COLUMN).is_null())
+            .then(pl.lit("insert"))
+            .when(pl.col(f"{FINGERPRINT_COLUMN}_new").is_null())
+            .then(pl.lit("delete"))
+            .when(pl.col(FINGERPRINT_COLUMN) != pl.col(f"{FINGERPRINT_COLUMN}_new"))
+            .then(pl.lit("update"))
+            .otherwise(pl.lit("unchanged"))
+            .alias("change"),
+        )
+    )
+
+
+def compute_changes(
+    df: pl.DataFrame,
+    primary_key: list[str],
+    snapshot_path: str | Path,
+    feature_columns: list[str] | None = None,
+) -> ChangeSet:
+    """
+    Compares the frame against the fingerprints of the previous snapshot and returns only
+    the rows that were inserted or updated, plus the keys that disappeared.
+    """
+    feature_columns = feature_columns or [c for c in df.columns if c not in primary_key]
+    current = compute_row_fingerprints(df, primary_key, feature_columns)
+    previous = load_snapshot(snapshot_path, primary_key, feature_columns)
+
+    if previous is None:
+        upserts = df.unique(subset=primary_key, keep="last", maintain_order=True)
+        return ChangeSet(
+            upserts=upserts,
+            deletes=df.select(primary_key).clear(),
+            fingerprints=current,
+            n_inserts=len(upserts),
+            n_updates=0,
+            n_unchanged=0,
+        )
+
+    changes = diff_fingerprints(previous, current, primary_key)
+    counts = dict(changes.group_by("change").len().iter_rows())
+    changed_keys = changes.filter(pl.col("change").is_in(["insert", "update"])).select(primary_key)
+    upserts = df.unique(subset=primary_key, keep="last", maintain_order=True).join(
+        changed_keys, on=primary_key, how="semi"
+    )
+    deletes = changes.filter(pl.col("change") == "delete").select(primary_key)
+
+    return ChangeSet(
+        upserts=upserts,
+        deletes=deletes,
+        fingerprints=current,
+        n_inserts=counts.get("insert", 0),
+        n_updates=counts.get("update", 0),
+        n_unchanged=counts.get("unchanged", 0),
+    )
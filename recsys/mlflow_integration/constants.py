@@ -1,6 +1,3 @@
-from feast import Field
-from feast.types import Int64, String, Float64, Array
-
 ### Post ingestion format.###
 
 customer_feature_descriptions = [
@@ -86,117 +83,136 @@ ranking_feature_descriptions = [
 
 ### Pre ingestion format. ###
 
-article_feature_description = [
-    Field(
-        name="article_id", dtype=String, description="Identifier for the article."
-    ),
-    Field(
-        name="product_code",
-        dtype=Int64,
-        description="Code associated with the product.",
-    ),
-    Field(name="prod_name", dtype=String, description="Name of the product."),
-    Field(
-        name="product_type_no",
-        dtype=Int64,
-        description="Number associated with the product type.",
-    ),
-    Field(
-        name="product_type_name", dtype=String, description="Name of the product type."
-    ),
-    Field(
-        name="product_group_name",
-        dtype=String,
-        description="Name of the product group.",
-    ),
-    Field(
-        name="graphical_appearance_no",
-        dtype=Int64,
-        description="Number associated with graphical appearance.",
-    ),
-    Field(
-        name="graphical_appearance_name",
-        dtype=String,
-        description="Name of the graphical appearance.",
-    ),
-    Field(
-        name="colour_group_code",
-        dtype=Int64,
-        description="Code associated with the colour group.",
-    ),
-    Field(
-        name="colour_group_name", dtype=String, description="Name of the colour group."
-    ),
-    Field(
-        name="perceived_colour_value_id",
-        dtype=Int64,
-        description="ID associated with perceived colour value.",
-    ),
-    Field(
-        name="perceived_colour_value_name",
-        dtype=String,
-        description="Name of the perceived colour value.",
-    ),
-    Field(
-        name="perceived_colour_master_id",
-        dtype=Int64,
-        description="ID associated with perceived colour master.",
-    ),
-    Field(
-        name="perceived_colour_master_name",
-        dtype=String,
-        description="Name of the perceived colour master.",
-    ),
-    Field(
-        name="department_no",
-        dtype=Int64,
-        description="Number associated with the department.",
-    ),
-    Field(
-        name="department_name", dtype=String, description="Name of the department."
-    ),
-    Field(
-        name="index_code", dtype=String, description="Code associated with the index."
-    ),
-    Field(name="index_name", dtype=String, description="Name of the index."),
-    Field(
-        name="index_group_no",
-        dtype=Int64,
-        description="Number associated with the index group.",
-    ),
-    Field(
-        name="index_group_name", dtype=String, description="Name of the index group."
-    ),
-    Field(
-        name="section_no",
-        dtype=Int64,
-        description="Number associated with the section.",
-    ),
-    Field(name="section_name", dtype=String, description="Name of the section."),
-    Field(
-        name="garment_group_no",
-        dtype=Int64,
-        description="Number associated with the garment group.",
-    ),
-    Field(
-        name="garment_group_name",
-        dtype=String,
-        description="Name of the garment group.",
-    ),
-    Field(
-        name="prod_name_length",
-        dtype=Int64,
-        description="Length of the product name.",
-    ),
-    Field(
-        name="article_description",
-        dtype=String,
-        description="Description of the article.",
-    ),
-    Field(
-        name="embeddings",
-        dtype=Array(Float64),
-        description="Vector embeddings of the article description.",
-    ),
-    Field(name="image_url", dtype=String, description="URL of the product image."),
-]
\ No newline at end of file
+
+def _build_article_feature_description() -> list:
+    # feast is only needed for this schema, import it when the schema is first used.
+    from feast import Field
+    from feast.types import Array, Float64, Int64, String
+
+    return [
+        Field(
+            name="article_id", dtype=String, description="Identifier for the article."
+        ),
+        Field(
+            name="product_code",
+            dtype=Int64,
+            description="Code associated with the product.",
+        ),
+        Field(name="prod_name", dtype=String, description="Name of the product."),
+        Field(
+            name="product_type_no",
+            dtype=Int64,
+            description="Number associated with the product type.",
+        ),
+        Field(
+            name="product_type_name", dtype=String, description="Name of the product type."
+        ),
+        Field(
+            name="product_group_name",
+            dtype=String,
+            description="Name of the product group.",
+        ),
+        Field(
+            name="graphical_appearance_no",
+            dtype=Int64,
+            description="Number associated with graphical appearance.",
+        ),
+        Field(
+            name="graphical_appearance_name",
+            dtype=String,
+            description="Name of the graphical appearance.",
+        ),
+        Field(
+            name="colour_group_code",
+            dtype=Int64,
+            description="Code associated with the colour group.",
+        ),
+        Field(
+            name="colour_group_name", dtype=String, description="Name of the colour group."
+        ),
+        Field(
+            name="perceived_colour_value_id",
+            dtype=Int64,
+            description="ID associated with perceived colour value.",
+        ),
+        Field(
+            name="perceived_colour_value_name",
+            dtype=String,
+            description="Name of the perceived colour value.",
+        ),
+        Field(
+            name="perceived_colour_master_id",
+            dtype=Int64,
+            description="ID associated with perceived colour master.",
+        ),
+        Field(
+            name="perceived_colour_master_name",
+            dtype=String,
+            description="Name of the perceived colour master.",
+        ),
+        Field(
+            name="department_no",
+            dtype=Int64,
+            description="Number associated with the department.",
+        ),
+        Field(
+            name="department_name", dtype=String, description="Name of the department."
+        ),
+        Field(
+            name="index_code", dtype=String, description="Code associated with the index."
+        ),
+        Field(name="index_name", dtype=String, description="Name of the index."),
+        Field(
+            name="index_group_no",
+            dtype=Int64,
+            description="Number associated with the index group.",
+        ),
+        Field(
+            name="index_group_name", dtype=String, description="Name of the index group."
+        ),
+        Field(
+            name="section_no",
+            dtype=Int64,
+            description="Number associated with the section.",
+        ),
+        Field(name="section_name", dtype=String, description="Name of the section."),
+        Field(
+            name="garment_group_no",
+            dtype=Int64,
+            description="Number associated with the garment group.",
+        ),
+        Field(
+            name="garment_group_name",
+            dtype=String,
+            description="Name of the garment group.",
+        ),
+        Field(
+            name="prod_name_length",
+            dtype=Int64,
+            description="Length of the product name.",
+        ),
+        Field(
+            name="article_description",
+            dtype=String,
+            description="Description of the article.",
+        ),
+        Field(
+            name="embeddings",
+            dtype=Array(Float64),
+            description="Vector embeddings of the article description.",
+        ),
+        Field(name="image_url", dtype=String, description="URL of the product image."),
+    ]
+
+
+_LAZY_ATTRIBUTES = {
+    "article_feature_description": _build_article_feature_description,
+}
+
+
+def __getattr__(name: str):
+    if name in _LAZY_ATTRIBUTES:
+        value = _LAZY_ATTRIBUTES[name]()
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
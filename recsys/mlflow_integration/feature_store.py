@@ -1,13 +1,22 @@
-import pandas as pd
-from hsfs import embedding
+from __future__ import annotations
+
+from pathlib import Path
+from typing import TYPE_CHECKING
+
 from loguru import logger
 
 from recsys.config import settings
 from recsys.mlflow_integration import constants
 from recsys.features.transactions import month_cos, month_sin
 
+if TYPE_CHECKING:
+    import pandas as pd
+    import polars as pl
+
 
 def get_feature_store():
+    import hopsworks
+
     if settings.HOPSWORKS_API_KEY:
         logger.info("Loging to Hopsworks using HOPSWORKS_API_KEY env var.")
         project = hopsworks.login(
@@ -24,15 +33,57 @@ def get_feature_store():
 ########################
 
 
-def create_customers_feature_group(fs, df: pd.DataFrame, online_enabled: bool = True):
+def insert_changes(
+    fg,
+    df: pd.DataFrame,
+    primary_key: list[str],
+    fingerprints_dir: str | None = None,
+    event_time: str | None = None,
+) -> dict[str, int] | None:
+    """
+    Inserts `df` into the feature group. With `fingerprints_dir`, only rows whose
+    fingerprint changed since the previous snapshot are upserted and vanished keys are
+    deleted, see `recsys.mlflow_integration.change_capture`.
+    `primary_key` must be the feature group's primary key. With `event_time`, the latest
+    row of every key is the one diffed and upserted, as the online store keeps only that one.
+    """
+    if fingerprints_dir is None:
+        fg.insert(df, wait=True)
+        return None
+
+    import polars as pl
+
+    from recsys.mlflow_integration.change_capture import compute_changes, save_snapshot
+
+    snapshot_path = Path(fingerprints_dir) / f"{fg.name}_v{fg.version}.parquet"
+    frame = pl.from_pandas(df)
+    if event_time is not None:
+        frame = frame.sort(event_time, maintain_order=True)
+    changes = compute_changes(frame, primary_key, snapshot_path)
+    logger.info(f"Feature group '{fg.name}' changes: {changes.summary()}")
+
+    if len(changes.upserts):
+        fg.insert(changes.upserts.to_pandas(), wait=True)
+    if changes.n_deletes:
+        fg.commit_delete_record(changes.deletes.to_pandas())
+
+    feature_columns = [c for c in frame.columns if c not in primary_key]
+    save_snapshot(changes.fingerprints, snapshot_path, primary_key, feature_columns)
+    return changes.summary()
+
+
+def create_customers_feature_group(
+        fs, df: pd.DataFrame, online_enabled: bool = True, fingerprints_dir: str | None = None
+):
+    primary_key = ["customer_id"]
     customers_fg = fs.get_or_create_feature_group(
         name="customers",
         description="Customers data including age and postal code",
         version=1,
-        primary_key=["customer_id"],
+        primary_key=primary_key,
         online_enabled=online_enabled,
     )
-    customers_fg.insert(df, wait=True)
+    insert_changes(customers_fg, df, primary_key, fingerprints_dir)
 
     for desc in constants.customer_feature_descriptions:
         customers_fg.update_feature_description(desc["name"], desc["description"])
@@ -45,38 +96,43 @@ def create_articles_feature_group(
         df: pd.DataFrame,
         articles_description_embedding_dim: int,
         online_enabled: bool = True,
+        fingerprints_dir: str | None = None,
 ):
+    from hsfs import embedding
+
     # Create the Embedding Index for the articles description embedding.
     emb = embedding.EmbeddingIndex()
     emb.add_embedding("embeddings", articles_description_embedding_dim)
 
+    primary_key = ["article_id"]
     articles_fg = fs.get_or_create_feature_group(
         name="articles",
         version=1,
         description="Fashion items data including type of item, visual description and category",
-        primary_key=["article_id"],
+        primary_key=primary_key,
         online_enabled=online_enabled,
         features=constants.article_feature_description,
         embedding_index=emb,
     )
-    articles_fg.insert(df, wait=True)
+    insert_changes(articles_fg, df, primary_key, fingerprints_dir)
 
     return articles_fg
 
 
 def create_transactions_feature_group(
-        fs, df: pd.DataFrame, online_enabled: bool = True
+        fs, df: pd.DataFrame, online_enabled: bool = True, fingerprints_dir: str | None = None
 ):
+    primary_key = ["customer_id", "article_id"]
     trans_fg = fs.get_or_create_feature_group(
         name="transactions",
         version=1,
         description="Transactions data including customer, item, price, sales channel and transaction date",
-        primary_key=["customer_id", "article_id"],
+        primary_key=primary_key,
         online_enabled=online_enabled,
         transformation_functions=[month_sin, month_cos],
         event_time="t_dat",
     )
-    trans_fg.insert(df, wait=True)
+    insert_changes(trans_fg, df, primary_key, fingerprints_dir, event_time="t_dat")
 
     for desc in constants.transactions_feature_descriptions:
         trans_fg.update_feature_description(desc["name"], desc["description"])
@@ -85,21 +141,19 @@ def create_transactions_feature_group(
 
 
 def create_interactions_feature_group(
-        fs, df: pd.DataFrame, online_enabled: bool = True
+        fs, df: pd.DataFrame, online_enabled: bool = True, fingerprints_dir: str | None = None
 ):
+    primary_key = ["customer_id", "article_id"]
     interactions_fg = fs.get_or_create_feature_group(
         name="interactions",
         version=1,
         description="Customer interactions with articles including purchases, clicks, and ignores. Used for building recommendation systems and analyzing user behavior.",
-        primary_key=["customer_id", "article_id"],
+        primary_key=primary_key,
         online_enabled=online_enabled,
         event_time="t_dat",
     )
 
-    interactions_fg.insert(
-        df,
-        wait=True,
-    )
+    insert_changes(interactions_fg, df, primary_key, fingerprints_dir, event_time="t_dat")
 
     for desc in constants.interactions_feature_descriptions:
         interactions_fg.update_feature_description(desc["name"], desc["description"])
@@ -108,17 +162,22 @@ def create_interactions_feature_group(
 
 
 def create_ranking_feature_group(
-    fs, df: pd.DataFrame, parents: list, online_enabled: bool = True
+    fs,
+    df: pd.DataFrame,
+    parents: list,
+    online_enabled: bool = True,
+    fingerprints_dir: str | None = None,
 ):
+    primary_key = ["customer_id", "article_id"]
     rank_fg = fs.get_or_create_feature_group(
         name="ranking",
         version=1,
         description="Derived feature group for ranking",
-        primary_key=["customer_id", "article_id"],
+        primary_key=primary_key,
         parents=parents,
         online_enabled=online_enabled,
     )
-    rank_fg.insert(df, wait=True)
+    insert_changes(rank_fg, df, primary_key, fingerprints_dir)
 
     for desc in constants.ranking_feature_descriptions:
         rank_fg.update_feature_description(desc["name"], desc["description"])
@@ -127,8 +186,10 @@ def create_ranking_feature_group(
 
 
 def create_candidate_embeddings_feature_group(
-        fs, df: pd.DataFrame, online_enabled: bool = True
+        fs, df: pd.DataFrame, online_enabled: bool = True, fingerprints_dir: str | None = None
 ):
+    from hsfs import embedding
+
     embedding_index = embedding.EmbeddingIndex()
 
     embedding_index.add_embedding(
@@ -136,19 +197,41 @@ def create_candidate_embeddings_feature_group(
         settings.TWO_TOWER_MODEL_EMBEDDING_SIZE,
     )
 
+    primary_key = ["article_id"]
     candidate_embeddings_fg = fs.get_or_create_feature_group(
         name="candidate_embeddings",
         embedding_index=embedding_index,  # Specify the Embedding Index
-        primary_key=["article_id"],
+        primary_key=primary_key,
         version=1,
         description="Embeddings for each article.",
         online_enabled=online_enabled,
     )
-    candidate_embeddings_fg.insert(df, wait=True)
+    insert_changes(candidate_embeddings_fg, df, primary_key, fingerprints_dir)
 
     return candidate_embeddings_fg
 
 
+def publish_feature_group_statistics(fg, profile: pl.DataFrame) -> None:
+    """
+    Publishes a column profile from `recsys.features.profiling` as the statistics of a
+    feature group: one MLflow table artifact per feature group version, plus the per-column
+    null fractions as metrics so data-quality drift shows up across runs.
+    """
+    import mlflow
+
+    prefix = f"{fg.name}_v{fg.version}"
+    mlflow.log_table(
+        data=profile.to_pandas(),
+        artifact_file=f"feature_group_statistics/{prefix}.json",
+    )
+    mlflow.log_metrics(
+        {
+            f"{prefix}.{row['column']}.null_fraction": row["null_fraction"]
+            for row in profile.iter_rows(named=True)
+        }
+    )
+
+
 #########################
 ##### Feature Views #####
 #########################
@@ -0,0 +1,320 @@
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import aiohttp
+import polars as pl
+from loguru import logger
+from tqdm.auto import tqdm
+
+from recsys.config import settings
+
+MANIFEST_FILE_NAME = "manifest.jsonl"
+
+MANIFEST_SCHEMA = {
+    "article_id": pl.Utf8,
+    "image_url": pl.Utf8,
+    "status": pl.Utf8,
+    "http_status": pl.Int64,
+    "image_sha256": pl.Utf8,
+    "image_path": pl.Utf8,
+    "image_size": pl.Int64,
+}
+
+# Transient failures worth another attempt. Anything else (404, 403, ...) is final.
+RETRYABLE_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+
+@dataclass
+class ImageFetchConfig:
+    "Knobs for the async image downloader."
+
+    max_connections: int = 64
+    max_connections_per_host: int = 32
+    max_requests_per_second: float = 200.0
+    max_retries: int = 4
+    backoff_base: float = 0.5
+    backoff_max: float = 30.0
+    timeout: float = 30.0
+    shard_depth: int = 2
+    checkpoint_every: int = 500
+
+
+class RateLimiter:
+    "Token bucket shared by all the download tasks of a single run."
+
+    def __init__(self, rate: float, burst: float | None = None) -> None:
+        self._rate = rate
+        self._capacity = burst if burst is not None else max(rate, 1.0)
+        self._tokens = self._capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        if self._rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    self._capacity, self._tokens + (now - self._updated) * self._rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self._rate)
+
+
+def image_cache_path(cache_dir: str | Path, sha256: str, shard_depth: int = 2) -> Path:
+    "Returns the sharded, content-addressed location of an image, e.g. 'ab/cd/abcd....jpg'."
+    shards = [sha256[2 * i : 2 * i + 2] for i in range(shard_depth)]
+    return Path(cache_dir).joinpath(*shards, f"{sha256}.jpg")
+
+
+def load_image_manifest(cache_dir: str | Path) -> pl.DataFrame:
+    """
+    Reads the manifest journal of a cache directory.
+    Later entries for the same URL win, so retried downloads override earlier failures.
+    """
+    manifest_path = Path(cache_dir) / MANIFEST_FILE_NAME
+    if not manifest_path.exists():
+        return pl.DataFrame(schema=MANIFEST_SCHEMA)
+
+    records = []
+    with manifest_path.open("r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                # A torn last line from an interrupted run.
+                logger.warning(f"Skipping corrupt manifest line in {manifest_path}.")
+
+    if not records:
+        return pl.DataFrame(schema=MANIFEST_SCHEMA)
+
+    return (
+        pl.DataFrame(records, schema=MANIFEST_SCHEMA)
+        .unique(subset=["image_url"], keep="last", maintain_order=True)
+    )
+
+
+def _write_image(path: Path, content: bytes) -> None:
+    if path.exists():
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Identical images share a path, so concurrent writers each need their own temp file.
+    with tempfile.NamedTemporaryFile(dir=path.parent, suffix=".tmp", delete=False) as f:
+        f.write(content)
+    try:
+        os.replace(f.name, path)
+    except OSError:
+        if not path.exists():
+            raise
+    finally:
+        if os.path.exists(f.name):
+            os.remove(f.name)
+
+
+def _append_manifest(manifest_path: Path, records: list[dict]) -> None:
+    if not records:
+        return
+    with manifest_path.open("a", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+async def _fetch_one(
+    session: aiohttp.ClientSession,
+    rate_limiter: RateLimiter,
+    article_id: str,
+    url: str,
+    cache_dir: Path,
+    config: ImageFetchConfig,
+) -> dict:
+    record = {
+        "article_id": article_id,
+        "image_url": url,
+        "status": "failed",
+        "http_status": None,
+        "image_sha256": None,
+        "image_path": None,
+        "image_size": None,
+    }
+
+    for attempt in range(config.max_retries + 1):
+        await rate_limiter.acquire()
+        try:
+            async with session.get(url) as response:
+                record["http_status"] = response.status
+                if response.status == 200:
+                    content = await response.read()
+                    sha256 = hashlib.sha256(content).hexdigest()
+                    path = image_cache_path(cache_dir, sha256, config.shard_depth)
+                    await asyncio.to_thread(_write_image, path, content)
+                    record.update(
+                        status="ok",
+                        image_sha256=sha256,
+                        image_path=str(path.relative_to(cache_dir)),
+                        image_size=len(content),
+                    )
+                    return record
+                if response.status not in RETRYABLE_STATUSES:
+                    record["status"] = "missing" if response.status == 404 else "failed"
+                    return record
+                retry_after = response.headers.get("Retry-After")
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+            logger.debug(f"Fetching {url} failed on attempt {attempt + 1}: {e!r}")
+            retry_after = None
+
+        if attempt < config.max_retries:
+            delay = min(config.backoff_max, config.backoff_base * 2**attempt)
+            if retry_after is not None and retry_after.isdigit():
+                delay = max(delay, float(retry_after))
+            await asyncio.sleep(delay)
+
+    return record
+
+
+async def fetch_images_async(
+    df: pl.DataFrame,
+    cache_dir: str | Path | None = None,
+    url_column: str = "image_url",
+    id_column: str = "article_id",
+    config: ImageFetchConfig | None = None,
+    session: aiohttp.ClientSession | None = None,
+) -> pl.DataFrame:
+    """
+    Downloads every image referenced by `url_column` into a content-addressed cache.
+    URLs already recorded as 'ok' or 'missing' in the cache manifest are skipped, so an
+    interrupted run resumes where it stopped. Pass `session` to reuse an existing client.
+    """
+    config = config or ImageFetchConfig()
+    cache_dir = Path(cache_dir or settings.IMAGES_CACHE_DIR)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = cache_dir / MANIFEST_FILE_NAME
+
+    manifest = load_image_manifest(cache_dir)
+    done_urls = set(manifest.filter(pl.col("status") == "missing")["image_url"].to_list())
+    # Trust 'ok' entries only while their file is still in the cache.
+    for url, image_path in manifest.filter(pl.col("status") == "ok").select(
+        "image_url", "image_path"
+    ).iter_rows():
+        if (cache_dir / image_path).exists():
+            done_urls.add(url)
+    pending = (
+        df.select(
+            pl.col(id_column).cast(pl.Utf8).alias("article_id"),
+            pl.col(url_column).alias("image_url"),
+        )
+        .drop_nulls("image_url")
+        .unique(subset=["image_url"], maintain_order=True)
+        .filter(~pl.col("image_url").is_in(list(done_urls)))
+    )
+    logger.info(
+        f"{len(done_urls)} images already cached, {len(pending)} images to fetch."
+    )
+
+    owns_session = session is None
+    if owns_session:
+        connector = aiohttp.TCPConnector(
+            limit=config.max_connections,
+            limit_per_host=config.max_connections_per_host,
+            ttl_dns_cache=300,
+        )
+        session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=config.timeout),
+        )
+
+    rate_limiter = RateLimiter(config.max_requests_per_second)
+    semaphore = asyncio.Semaphore(config.max_connections)
+
+    async def bounded_fetch(article_id: str, url: str) -> dict:
+        async with semaphore:
+            return await _fetch_one(
+                session, rate_limiter, article_id, url, cache_dir, config
+            )
+
+    buffer: list[dict] = []
+    in_flight: set[asyncio.Task] = set()
+    pbar = tqdm(total=len(pending), desc="fetch images")
+    try:
+        # Only keep a bounded number of tasks in flight so 100k+ URLs do not
+        # materialize 100k+ coroutines at once.
+        rows = iter(pending.iter_rows())
+        window = config.max_connections * 4
+        while True:
+            while len(in_flight) < window:
+                row = next(rows, None)
+                if row is None:
+                    break
+                in_flight.add(asyncio.create_task(bounded_fetch(*row)))
+            if not in_flight:
+                break
+
+            finished, in_flight = await asyncio.wait(
+                in_flight, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in finished:
+                buffer.append(task.result())
+            pbar.update(len(finished))
+
+            if len(buffer) >= config.checkpoint_every:
+                await asyncio.to_thread(_append_manifest, manifest_path, buffer)
+                buffer = []
+    finally:
+        for task in in_flight:
+            task.cancel()
+        _append_manifest(manifest_path, buffer)
+        pbar.close()
+        if owns_session:
+            await session.close()
+
+    return load_image_manifest(cache_dir)
+
+
+def fetch_images(
+    df: pl.DataFrame,
+    cache_dir: str | Path | None = None,
+    url_column: str = "image_url",
+    id_column: str = "article_id",
+    config: ImageFetchConfig | None = None,
+) -> pl.DataFrame:
+    "Synchronous entry point for `fetch_images_async`, returns the cache manifest."
+    return asyncio.run(
+        fetch_images_async(
+            df,
+            cache_dir=cache_dir,
+            url_column=url_column,
+            id_column=id_column,
+            config=config,
+        )
+    )
+
+
+def join_image_manifest(
+    articles_df: pl.DataFrame, manifest: pl.DataFrame, url_column: str = "image_url"
+) -> pl.DataFrame:
+    "Left joins the cache manifest onto the articles, keyed by image URL."
+    return articles_df.join(
+        manifest.select(
+            pl.col("image_url").alias(url_column),
+            pl.col("status").alias("image_status"),
+            "image_sha256",
+            "image_path",
+            "image_size",
+        ),
+        on=url_column,
+        how="left",
+    )
@@ -0,0 +1,285 @@
+import json
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+from loguru import logger
+
+# Columns of the `retrieval` feature view, see `create_retrieval_feature_view`.
+RETRIEVAL_COLUMNS = [
+    "customer_id",
+    "article_id",
+    "t_dat",
+    "price",
+    "month_sin",
+    "month_cos",
+    "age",
+    "club_member_status",
+    "age_group",
+    "garment_group_name",
+    "index_group_name",
+]
+
+VOCABULARY_COLUMNS = [
+    "customer_id",
+    "article_id",
+    "club_member_status",
+    "age_group",
+    "garment_group_name",
+    "index_group_name",
+]
+
+# Rows missing one of these cannot be used for training and are dropped.
+REQUIRED_COLUMNS = ["customer_id", "article_id", "t_dat"]
+
+SCHEMA_FILE = "schema.json"
+
+_KIND_TO_POLARS = {"string": pl.Utf8, "int64": pl.Int64, "float32": pl.Float32}
+# Other nulls are filled per kind, strings like the ranker's unknown category.
+_KIND_TO_NULL_FILL = {"string": "UNKNOWN", "int64": -1, "float32": float("nan")}
+
+
+def _column_kind(dtype: pl.DataType) -> str:
+    if dtype.is_integer() or dtype.is_temporal():
+        return "int64"
+    if dtype.is_float() or dtype.is_decimal():
+        return "float32"
+    return "string"
+
+
+def _as_polars(batch) -> pl.DataFrame:
+    return batch if isinstance(batch, pl.DataFrame) else pl.from_pandas(batch)
+
+
+def _write_tfrecord_shard(df: pl.DataFrame, path: Path, kinds: dict[str, str]) -> None:
+    import tensorflow as tf
+
+    def feature(kind: str, value) -> tf.train.Feature:
+        if kind == "string":
+            return tf.train.Feature(bytes_list=tf.train.BytesList(value=[value.encode()]))
+        if kind == "int64":
+            return tf.train.Feature(int64_list=tf.train.Int64List(value=[value]))
+        return tf.train.Feature(float_list=tf.train.FloatList(value=[value]))
+
+    options = tf.io.TFRecordOptions(compression_type="GZIP")
+    with tf.io.TFRecordWriter(str(path), options=options) as writer:
+        for row in df.iter_rows(named=True):
+            example = tf.train.Example(
+                features=tf.train.Features(
+                    feature={name: feature(kind, row[name]) for name, kind in kinds.items()}
+                )
+            )
+            writer.write(example.SerializeToString())
+
+
+def export_retrieval_dataset(
+    batches: "pl.DataFrame | Iterable",
+    output_dir: str | Path,
+    file_format: str = "parquet",
+    rows_per_shard: int = 500_000,
+    columns: list[str] | None = None,
+    vocabulary_columns: list[str] | None = None,
+) -> dict:
+    """
+    Writes the joined retrieval dataset as compressed shards (zstd Parquet or GZIP TFRecord)
+    plus one vocabulary file per categorical column, ordered by frequency.
+    Rows missing a `REQUIRED_COLUMNS` value are dropped and counted in the manifest, other
+    nulls are filled per column kind.
+    `batches` is a polars/pandas frame or an iterable of them, e.g. chunks read from the
+    `retrieval` feature view, so the full dataset never has to be held in memory.
+    """
+    if file_format not in ("parquet", "tfrecord"):
+        raise ValueError(f"Unsupported format '{file_format}', use 'parquet' or 'tfrecord'.")
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    columns = columns or RETRIEVAL_COLUMNS
+    vocabulary_columns = vocabulary_columns or VOCABULARY_COLUMNS
+    if isinstance(batches, pl.DataFrame) or hasattr(batches, "to_numpy"):
+        batches = [batches]
+
+    kinds: dict[str, str] | None = None
+    counts: dict[str, pl.DataFrame] = {}
+    shards: list[str] = []
+    buffer: list[pl.DataFrame] = []
+    buffered_rows = 0
+    n_rows = 0
+    n_dropped = 0
+
+    def flush(frames: list[pl.DataFrame]) -> None:
+        df = pl.concat(frames)
+        name = f"part-{len(shards):05d}.{'parquet' if file_format == 'parquet' else 'tfrecord.gz'}"
+        if file_format == "parquet":
+            df.write_parquet(output_dir / name, compression="zstd", row_group_size=64_000)
+        else:
+            _write_tfrecord_shard(df, output_dir / name, kinds)
+        shards.append(name)
+
+    for batch in batches:
+        df = _as_polars(batch).select(columns)
+        if kinds is None:
+            kinds = {name: _column_kind(dtype) for name, dtype in df.schema.items()}
+        n_batch_rows = len(df)
+        df = df.drop_nulls([name for name in REQUIRED_COLUMNS if name in kinds]).with_columns(
+            [
+                # Event times are exported as epoch milliseconds, like `compute_features_transactions`.
+                (
+                    pl.col(name).dt.epoch("ms")
+                    if df.schema[name].is_temporal()
+                    else pl.col(name).cast(_KIND_TO_POLARS[kind])
+                ).fill_null(_KIND_TO_NULL_FILL[kind])
+                for name, kind in kinds.items()
+            ]
+        )
+        n_dropped += n_batch_rows - len(df)
+
+        for name in vocabulary_columns:
+            batch_counts = df.group_by(name).len()
+            counts[name] = (
+                pl.concat([counts[name], batch_counts])
+                .group_by(name)
+                .agg(pl.col("len").sum())
+                if name in counts
+                else batch_counts
+            )
+
+        n_rows += len(df)
+        buffer.append(df)
+        buffered_rows += len(df)
+        while buffered_rows >= rows_per_shard:
+            merged = pl.concat(buffer)
+            flush([merged.head(rows_per_shard)])
+            rest = merged.slice(rows_per_shard)
+            buffer, buffered_rows = ([rest] if len(rest) else []), len(rest)
+
+    if buffer:
+        flush(buffer)
+
+    vocabularies = {}
+    for name, column_counts in counts.items():
+        vocabulary = column_counts.sort(["len", name], descending=[True, False])[name]
+        path = output_dir / f"vocab_{name}.txt"
+        path.write_text("\n".join(vocabulary.cast(pl.Utf8).to_list()) + "\n", encoding="utf-8")
+        vocabularies[name] = path.name
+
+    manifest = {
+        "format": file_format,
+        "n_rows": n_rows,
+        "n_dropped_rows": n_dropped,
+        "columns": kinds or {},
+        "shards": shards,
+        "vocabularies": vocabularies,
+    }
+    with (output_dir / SCHEMA_FILE).open("w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    if n_dropped:
+        logger.warning(f"Dropped {n_dropped} rows without one of {REQUIRED_COLUMNS}.")
+    logger.info(f"Exported {n_rows} rows into {len(shards)} {file_format} shards in {output_dir}.")
+    return manifest
+
+
+def load_schema(directory: str | Path) -> dict:
+    with (Path(directory) / SCHEMA_FILE).open("r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_vocabulary(directory: str | Path, column: str) -> list[str]:
+    "Vocabulary of a categorical column, e.g. for a `tf.keras.layers.StringLookup`."
+    schema = load_schema(directory)
+    path = Path(directory) / schema["vocabularies"][column]
+    return path.read_text(encoding="utf-8").splitlines()
+
+
+def _parquet_chunks(path: bytes, columns: list, chunk_size: int) -> Iterator[dict]:
+    import pyarrow.parquet as pq
+
+    # Arguments arrive as bytes/numpy scalars when called through `from_generator`.
+    columns = [c.decode() if isinstance(c, bytes) else c for c in columns]
+    parquet_file = pq.ParquetFile(path.decode())
+    for record_batch in parquet_file.iter_batches(batch_size=int(chunk_size), columns=columns):
+        yield {
+            name: record_batch.column(name).to_numpy(zero_copy_only=False)
+            for name in columns
+        }
+
+
+def make_retrieval_dataset(
+    directory: str | Path,
+    batch_size: int = 2048,
+    shuffle: bool = True,
+    shuffle_buffer: int = 100_000,
+    num_parallel_reads: int | None = None,
+    columns: list[str] | None = None,
+    seed: int | None = None,
+    repeat: bool = False,
+):
+    """
+    Streams the exported shards as a batched `tf.data.Dataset` of feature dicts.
+    Shards are read in parallel and interleaved, rows go through a shuffle buffer,
+    batches are prefetched, and at most `shuffle_buffer` rows are held in memory.
+    """
+    import tensorflow as tf
+
+    directory = Path(directory)
+    schema = load_schema(directory)
+    kinds = schema["columns"]
+    columns = columns or list(kinds)
+    tf_dtypes = {"string": tf.string, "int64": tf.int64, "float32": tf.float32}
+    num_parallel_reads = num_parallel_reads or tf.data.AUTOTUNE
+
+    files = tf.data.Dataset.from_tensor_slices([str(directory / s) for s in schema["shards"]])
+    if shuffle:
+        files = files.shuffle(len(schema["shards"]), seed=seed, reshuffle_each_iteration=True)
+    if repeat:
+        files = files.repeat()
+
+    if schema["format"] == "tfrecord":
+        feature_spec = {
+            name: tf.io.FixedLenFeature([], tf_dtypes[kinds[name]]) for name in columns
+        }
+        dataset = files.interleave(
+            lambda path: tf.data.TFRecordDataset(path, compression_type="GZIP"),
+            cycle_length=num_parallel_reads,
+            num_parallel_calls=tf.data.AUTOTUNE,
+            deterministic=not shuffle,
+        )
+        if shuffle:
+            dataset = dataset.shuffle(shuffle_buffer, seed=seed)
+        dataset = dataset.batch(batch_size).map(
+            lambda records: tf.io.parse_example(records, feature_spec),
+            num_parallel_calls=tf.data.AUTOTUNE,
+        )
+    else:
+        output_signature = {
+            name: tf.TensorSpec(shape=(None,), dtype=tf_dtypes[kinds[name]]) for name in columns
+        }
+        chunk_size = max(1024, min(batch_size, 65_536))
+        dataset = files.interleave(
+            lambda path: tf.data.Dataset.from_generator(
+                _parquet_chunks,
+                args=(path, columns, chunk_size),
+                output_signature=output_signature,
+            ),
+            cycle_length=num_parallel_reads,
+            num_parallel_calls=tf.data.AUTOTUNE,
+            deterministic=not shuffle,
+        ).unbatch()
+        if shuffle:
+            dataset = dataset.shuffle(shuffle_buffer, seed=seed)
+        dataset = dataset.batch(batch_size)
+
+    return dataset.prefetch(tf.data.AUTOTUNE)
+
+
+def iter_retrieval_batches(
+    directory: str | Path, columns: list[str] | None = None, chunk_size: int = 65_536
+) -> Iterator[dict[str, np.ndarray]]:
+    "Framework-free reader over Parquet shards, yields column dicts of numpy arrays."
+    schema = load_schema(directory)
+    if schema["format"] != "parquet":
+        raise ValueError("iter_retrieval_batches only reads Parquet exports.")
+    columns = columns or list(schema["columns"])
+    for shard in schema["shards"]:
+        yield from _parquet_chunks(str(Path(directory) / shard).encode(), columns, chunk_size)
@@ -0,0 +1,46 @@
+import polars as pl
+
+from recsys.mlflow_integration.change_capture import (
+    compute_changes,
+    compute_row_fingerprints,
+    save_snapshot,
+)
+
+
+def _articles(embeddings: list[list[float]], names: list[str]) -> pl.DataFrame:
+    return pl.DataFrame(
+        {
+            "article_id": [str(i) for i in range(len(names))],
+            "prod_name": names,
+            "embeddings": embeddings,
+        }
+    )
+
+
+def test_fingerprints_support_list_columns():
+    df = _articles([[0.1, 0.2], [0.3, 0.4]], ["a", "b"])
+    fingerprints = compute_row_fingerprints(df, ["article_id"])
+    assert fingerprints["__fingerprint"].dtype == pl.UInt64
+    assert fingerprints["__fingerprint"].n_unique() == 2
+
+
+def test_compute_changes_detects_list_updates(tmp_path):
+    snapshot_path = tmp_path / "articles_v1.parquet"
+    previous = _articles([[0.1, 0.2], [0.3, 0.4], [0.5, 0.6]], ["a", "b", "c"])
+    first = compute_changes(previous, ["article_id"], snapshot_path)
+    assert first.summary() == {"inserts": 3, "updates": 0, "deletes": 0, "unchanged": 0}
+    save_snapshot(first.fingerprints, snapshot_path, ["article_id"], ["prod_name", "embeddings"])
+
+    # Article 0 only changes its embedding, article 2 disappears and article 3 is new.
+    current = pl.DataFrame(
+        {
+            "article_id": ["0", "1", "3"],
+            "prod_name": ["a", "b", "d"],
+            "embeddings": [[0.1, 0.25], [0.3, 0.4], [0.7, 0.8]],
+        }
+    )
+    changes = compute_changes(current, ["article_id"], snapshot_path)
+
+    assert changes.summary() == {"inserts": 1, "updates": 1, "deletes": 1, "unchanged": 1}
+    assert sorted(changes.upserts["article_id"]) == ["0", "3"]
+    assert changes.deletes["article_id"].to_list() == ["2"]
@@ -0,0 +1,85 @@
+import asyncio
+from collections import Counter
+
+import polars as pl
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from recsys.raw_data_sources.images import ImageFetchConfig, fetch_images_async
+
+IMAGE = b"\xff\xd8 first image"
+OTHER_IMAGE = b"\xff\xd8 second image"
+
+
+def _stand_in_app(hits: Counter) -> web.Application:
+    "Local stand-in for the image CDN: a duplicate, a 404, a flaky and a broken URL."
+
+    async def handle(request: web.Request) -> web.Response:
+        name = request.match_info["name"]
+        hits[name] += 1
+        if name in ("a.jpg", "a-copy.jpg"):
+            return web.Response(body=IMAGE)
+        if name == "flaky.jpg" and hits[name] > 1:
+            return web.Response(body=OTHER_IMAGE)
+        if name in ("flaky.jpg", "down.jpg"):
+            return web.Response(status=503, headers={"Retry-After": "0"})
+        return web.Response(status=404)
+
+    app = web.Application()
+    app.router.add_get("/{name}", handle)
+    return app
+
+
+async def _fetch(server: TestServer, cache_dir, names: list[str]) -> pl.DataFrame:
+    df = pl.DataFrame(
+        {
+            "article_id": [str(i) for i in range(len(names))],
+            "image_url": [str(server.make_url(f"/{name}")) for name in names],
+        }
+    )
+    config = ImageFetchConfig(max_retries=2, backoff_base=0.0, max_requests_per_second=0)
+    return await fetch_images_async(df, cache_dir=cache_dir, config=config)
+
+
+def test_fetch_images_against_local_server(tmp_path):
+    names = ["a.jpg", "a-copy.jpg", "missing.jpg", "flaky.jpg", "down.jpg"]
+    hits: Counter = Counter()
+
+    async def run() -> tuple[pl.DataFrame, Counter, pl.DataFrame]:
+        async with TestServer(_stand_in_app(hits)) as server:
+            first = await _fetch(server, tmp_path, names)
+            first_hits = hits.copy()
+            # Resuming only retries the URLs that did not end as 'ok' or 'missing'.
+            hits.clear()
+            second = await _fetch(server, tmp_path, names)
+            return first, first_hits, second
+
+    first, first_hits, second = asyncio.run(run())
+
+    status = dict(zip(first["image_url"].str.split("/").list.last(), first["status"]))
+    assert status == {
+        "a.jpg": "ok",
+        "a-copy.jpg": "ok",
+        "missing.jpg": "missing",
+        "flaky.jpg": "ok",
+        "down.jpg": "failed",
+    }
+    # 503s are retried up to max_retries times, the 404 is final.
+    assert first_hits == {
+        "a.jpg": 1,
+        "a-copy.jpg": 1,
+        "missing.jpg": 1,
+        "flaky.jpg": 2,
+        "down.jpg": 3,
+    }
+
+    # Identical content is stored once.
+    paths = dict(zip(first["image_url"].str.split("/").list.last(), first["image_path"]))
+    assert paths["a.jpg"] == paths["a-copy.jpg"]
+    assert (tmp_path / paths["a.jpg"]).read_bytes() == IMAGE
+    assert (tmp_path / paths["flaky.jpg"]).read_bytes() == OTHER_IMAGE
+    assert len(list(tmp_path.rglob("*.jpg"))) == 2
+
+    assert hits == {"down.jpg": 3}
+    assert len(second) == len(names)
+    assert second.filter(pl.col("status") == "failed")["image_url"].str.ends_with("/down.jpg").all()
@@ -0,0 +1,40 @@
+from datetime import datetime
+from decimal import Decimal
+
+import polars as pl
+import pytest
+
+from recsys.features.profiling import non_null_columns, profile_columns
+from recsys.features.transactions import compute_features_transactions
+
+
+def test_profile_handles_null_and_decimal_columns():
+    df = pl.DataFrame(
+        {
+            "empty": [None, None, None],
+            "price": [Decimal("1.10"), Decimal("2.20"), None],
+            "age": [20, 30, 40],
+        },
+        schema={"empty": pl.Null, "price": pl.Decimal(10, 2), "age": pl.Int64},
+    )
+
+    profile = profile_columns(df)
+
+    assert profile["column"].to_list() == ["empty", "price", "age"]
+    assert profile["null_count"].to_list() == [3, 1, 0]
+    assert non_null_columns(profile) == ["age"]
+
+
+def test_transactions_profile_checks_keys():
+    df = pl.DataFrame(
+        {
+            "customer_id": ["c1", None],
+            "article_id": [1, 2],
+            "t_dat": [datetime(2020, 9, 1), datetime(2020, 9, 2)],
+        }
+    )
+
+    with pytest.raises(ValueError, match="customer_id"):
+        compute_features_transactions(df, profile=profile_columns(df))
+    complete = df.drop_nulls()
+    assert len(compute_features_transactions(complete, profile=profile_columns(complete))) == 1
@@ -0,0 +1,27 @@
+import numpy as np
+import polars as pl
+
+from recsys.inference.ranking import BatchRanker
+
+
+def test_categorical_features_come_from_the_source_schemas():
+    customers = pl.DataFrame({"customer_id": ["c1", "c2"], "age": [25.0, 40.0]})
+    articles = pl.DataFrame(
+        {
+            "article_id": [1, 2],
+            "product_type_name": ["Trousers", None],
+            "price": [0.02, 0.05],
+        }
+    )
+
+    ranker = BatchRanker(
+        model=None,
+        customers_df=customers,
+        articles_df=articles,
+        article_features=["product_type_name", "price"],
+    )
+
+    assert ranker.cat_features == ["product_type_name"]
+    rows = ranker.article_cache.rows(pl.Series(["1", "2"])).sort("article_id")["article_row"]
+    assert ranker.article_cache.arrays["product_type_name"][rows].tolist() == ["Trousers", "UNKNOWN"]
+    assert ranker.article_cache.arrays["price"].dtype == np.float64
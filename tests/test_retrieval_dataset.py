@@ -0,0 +1,32 @@
+from datetime import datetime
+
+import polars as pl
+
+from recsys.training.retrieval_dataset import export_retrieval_dataset
+
+
+def test_export_keeps_rows_with_null_features(tmp_path):
+    df = pl.DataFrame(
+        {
+            "customer_id": ["c1", "c2", None],
+            "article_id": ["a1", "a2", "a3"],
+            "t_dat": [datetime(2020, 9, 1), datetime(2020, 9, 2), datetime(2020, 9, 3)],
+            "price": [0.01, None, 0.02],
+            "age": [25.0, None, 40.0],
+            "club_member_status": ["ACTIVE", None, "ACTIVE"],
+        }
+    )
+
+    manifest = export_retrieval_dataset(
+        df,
+        tmp_path,
+        columns=df.columns,
+        vocabulary_columns=["customer_id", "club_member_status"],
+    )
+
+    assert manifest["n_rows"] == 2
+    assert manifest["n_dropped_rows"] == 1
+    exported = pl.read_parquet(tmp_path / manifest["shards"][0])
+    row = exported.filter(pl.col("customer_id") == "c2").row(0, named=True)
+    assert row["club_member_status"] == "UNKNOWN"
+    assert row["age"] != row["age"]  # NaN